@@ -2,21 +2,37 @@
 """
 GoldSpider API Service - FastAPI backend for gold news scraping
 """
+import base64
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from app.improved_scraper import ImprovedGoldScraper
-from app.config import JSON_DB_PATH
+from app.bm25_index import get_index
+from app.article_store import get_store
+from app.article_cache import get_article_cache
+from app.archive import get_archive
+from app.article_index import ArticleIndex
+from app.http_cache import (
+    make_etag, cache_headers, is_not_modified, matching_etag, negotiate_encoding, variant_headers, get_response_cache
+)
+from app.events import get_broker
+from app.publish import get_publisher
+from app.config import PUBLISH_ENABLED
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -43,22 +59,227 @@ scraper = ImprovedGoldScraper(use_proxies=False)
 
 # Models
 class Article(BaseModel):
+    id: Optional[str] = None
     title: str
     link: str
     source: str
     pub_date: str
     fetched_at: str
     content: Optional[str] = ""
+    content_ref: Optional[str] = None
+    content_length: Optional[int] = None
     summary: Optional[str] = None
     score: float
+    relevance: Optional[float] = None
+    bm25: Optional[float] = None
+    cluster_id: Optional[str] = None
+    cluster_size: Optional[int] = None
+
+class ArticleSummary(BaseModel):
+    """List item: the article without its body"""
+    id: Optional[str] = None
+    title: str
+    link: str
+    source: str
+    pub_date: str
+    fetched_at: str
+    summary: Optional[str] = None
+    score: float
+    relevance: Optional[float] = None
+    cluster_id: Optional[str] = None
+    cluster_size: Optional[int] = None
+
+# Fields /articles returns by default, and the ones `?fields=` may select from
+LIST_FIELDS = tuple(ArticleSummary.model_fields)
+ARTICLE_FIELDS = tuple(Article.model_fields)
+
+class SearchResult(BaseModel):
+    title: str
+    link: str
+    source: Optional[str] = None
+    pub_date: Optional[str] = None
+    fetched_at: Optional[str] = None
+    score: Optional[float] = None
+    snippet: str
+    rank: float
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    page: int
+    page_size: int
+    results: List[SearchResult]
 
 class ScrapeResponse(BaseModel):
     message: str
     count: int
 
+class FastJSONResponse(Response):
+    """
+    JSON response for records that are already known to be valid (they come from the store)
+
+    Skips pydantic validation and serializes with orjson when it is installed.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return json_bytes(content)
+
+def json_bytes(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def cached_response(request: Request, etag: str, last_modified: float, render, media_type: str,
+                    extra_headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Conditional, content-negotiated response served from the response cache
+
+    Answers 304 when the client's validator still matches. Otherwise the body for this
+    ETag is rendered once, and its gzip/brotli variant is compressed once, so repeat
+    requests are a memory lookup. `render` returns the uncompressed body as bytes.
+    """
+    headers = cache_headers(etag, last_modified)
+    headers.update(extra_headers or {})
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+    if is_not_modified(request.headers, etag, last_modified):
+        # Answered without rendering (no store or blob reads). The ETag is the variant a
+        # 200 would carry when this worker has it cached, otherwise the validator the
+        # client already holds
+        headers["ETag"] = (get_response_cache().variant_etag(etag, encoding)
+                           or matching_etag(request.headers.get('if-none-match'), etag)
+                           or etag)
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+    body, encoding = get_response_cache().get(etag, encoding, render)
+    return Response(body, media_type=media_type, headers=variant_headers(headers, encoding))
+
+def parse_fields(fields: Optional[str]) -> tuple:
+    """Fields selected by `?fields=a,b`; the body-less list fields by default"""
+    if not fields:
+        return LIST_FIELDS
+    selected = tuple(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    unknown = [name for name in selected if name not in ARTICLE_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown) or fields}")
+    return selected
+
 # Background task for scraping
 def run_scraper():
     scraper.run()
+    get_article_cache().invalidate()
+    get_broker().notify()
+    # Keep the static copies served by nginx in step with this ingest
+    if PUBLISH_ENABLED:
+        get_publisher().publish()
+
+def rank_articles(articles: List[Dict]) -> ArticleIndex:
+    """
+    Combine keyword score with BM25 content relevance and index the articles by it
+
+    The index holds copies, so the shared cached articles are never modified.
+    """
+    # Index any articles the BM25 index has not seen yet (e.g. written before it existed);
+    # only those need their bodies loaded, the list itself is metadata only
+    index = get_index()
+    missing = index.missing_links(articles)
+    if missing:
+        index.add_articles(get_store().get_many(missing, with_content=True))
+    
+    return ArticleIndex(
+        ({**article, 'relevance': relevance, 'bm25': bm25}
+         for article, (relevance, bm25) in zip(articles, index.combined_scores(articles))),
+        score_field='relevance'
+    )
+
+def encode_cursor(key, since: Optional[str]) -> str:
+    """Opaque cursor: the ranking position of the last article plus the pinned time window"""
+    raw = json.dumps([key[0], key[1], key[2], since], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str):
+    """Returns (score_key, since); raises HTTPException(400) for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        score, fetched_at, link, since = json.loads(raw)
+        return (float(score), str(fetched_at), str(link)), since
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def ranked_articles(limit: int = 50, days: int = 7, collapse: bool = False, cursor: Optional[str] = None):
+    """
+    Recent articles in relevance order, with a cursor and ETag/Last-Modified validators
+
+    Returns (articles, next_cursor, etag, last_modified). The cursor seeks straight to the
+    position after the previous page and pins its time window, so deep pages cost the same
+    as the first one. The ETag covers the store version and the identity of the result,
+    because the `days` window moves without the store changing.
+    """
+    # The relevance index is cached in memory until the store or the BM25 index changes
+    snapshot = get_article_cache().snapshot()
+    ranked = snapshot.derive('ranked', get_index().generation, rank_articles)
+    now = datetime.now()
+    if cursor:
+        after, since = decode_cursor(cursor)
+    else:
+        after, since = None, (now - timedelta(days=days)).isoformat() if days > 0 else None
+    
+    # Walk the relevance order from the cursor and stop after `limit` articles
+    articles = []
+    for article in ranked.by_score(since=since, after=after):
+        if len(articles) >= limit:
+            break
+        cluster_id = article.get('cluster_id')
+        if collapse and cluster_id:
+            # One representative per story cluster (its best-ranked article in the window),
+            # decided per article so that it holds across pages
+            if ranked.best('cluster_id', cluster_id, since=since) is not article:
+                continue
+            article = {**article, 'cluster_size': ranked.count('cluster_id', cluster_id, since=since)}
+        articles.append(article)
+    next_cursor = encode_cursor(ranked.score_key(articles[-1]), since) if len(articles) == limit else None
+    
+    etag = make_etag(snapshot.version, limit, days, collapse, cursor,
+                     [(a['link'], a.get('relevance'), a.get('cluster_size')) for a in articles])
+    # The result last changed when this version was loaded, or when the newest article
+    # that has since left the window dropped out of it
+    last_modified = snapshot.loaded_at
+    if since is not None and not cursor:
+        expired = ranked.by_time(until=since, limit=1)
+        if expired:
+            try:
+                dropped_at = datetime.fromisoformat(expired[0]['fetched_at']) + timedelta(days=days)
+                last_modified = max(last_modified, dropped_at.timestamp())
+            except (ValueError, TypeError):
+                pass
+    return articles, next_cursor, etag, min(last_modified, now.timestamp())
+
+# Number of ranked, collapsed articles on the home page (also used for the published copy)
+HOME_PAGE_SIZE = 20
+
+def page_url(name: str, **params) -> str:
+    """
+    url_for for the page templates
+
+    Builds site-relative paths, so a page renders the same for every host and also
+    without a request, which app/publish.py relies on to write the static copies.
+    """
+    if name == 'static':
+        return f"/static/{params['filename']}"
+    return app.url_path_for(name, **params)
+
+def render_page(name: str, **context) -> str:
+    """Render a template to a string so that it can be cached per store version"""
+    return templates.get_template(name).render(context)
+
+def render_home(articles: List[Dict]) -> str:
+    """The home page for ranked articles, with the live-update (SSE) hook"""
+    return render_page("index.html", articles=articles, events_url="/events")
+
+def render_detail(article: Dict, newer: Optional[Dict], older: Optional[Dict]) -> str:
+    """An article page, loading its body from the blob store"""
+    return render_page("article_detail.html",
+                       article={**article, 'content': get_store().load_content(article)},
+                       newer=newer, older=older)
 
 # Custom filter for date formatting
 def format_date(date_str):
@@ -68,20 +289,22 @@ def format_date(date_str):
     except (ValueError, TypeError):
         return date_str
 
+# Handlers that read the store, blobs or the search index are plain functions, so Starlette
+# runs them in its threadpool and the event loop stays free for the /events streams
+
 # Root endpoint serving the index template
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
+def home(request: Request):
     """
     Serve the main page with gold news articles
     """
     try:
-        articles = await get_articles(limit=20)
-        return templates.TemplateResponse(
-            "index.html", 
-            {
-                "request": request, 
-                "articles": articles
-            }
+        articles, _, etag, last_modified = ranked_articles(limit=HOME_PAGE_SIZE, collapse=True)
+        etag = make_etag("home", etag)
+        return cached_response(
+            request, etag, last_modified,
+            lambda: render_home(articles).encode('utf-8'),
+            media_type="text/html"
         )
     except Exception as e:
         return templates.TemplateResponse(
@@ -95,31 +318,33 @@ async def home(request: Request):
 
 # Article detail endpoint
 @app.get("/article/{article_id}", response_class=HTMLResponse)
-async def article_detail(request: Request, article_id: int):
+def article_detail(request: Request, article_id: str):
     """
     Show detailed view of a single article
+
+    `article_id` is the stable ID derived from the article's canonical URL and is looked
+    up in the cache's hash map; the previous/next links follow fetch time.
     """
     try:
-        all_articles = await get_articles(limit=100)
-        if 0 <= article_id < len(all_articles):
-            article = all_articles[article_id]
-            return templates.TemplateResponse(
-                "article_detail.html",
-                {
-                    "request": request,
-                    "article": article,
-                    "article_id": article_id
-                }
-            )
-        else:
+        snapshot = get_article_cache().snapshot()
+        article = snapshot.index.get_by_id(article_id)
+        if article is None:
             return templates.TemplateResponse(
                 "index.html", 
                 {
                     "request": request,
-                    "articles": all_articles,
+                    "articles": [],
                     "error": "Article not found"
-                }
+                },
+                status_code=404
             )
+        etag = make_etag("detail", snapshot.version, article_id)
+        newer, older = snapshot.index.neighbours(article['link'])
+        return cached_response(
+            request, etag, snapshot.loaded_at,
+            lambda: render_detail(article, newer, older).encode('utf-8'),
+            media_type="text/html"
+        )
     except Exception as e:
         return templates.TemplateResponse(
             "index.html",
@@ -130,33 +355,118 @@ async def article_detail(request: Request, article_id: int):
             }
         )
 
-@app.get("/articles", response_model=List[Article])
-async def get_articles(limit: int = 50, days: int = 7):
+@app.get("/articles", response_model=List[ArticleSummary], response_class=FastJSONResponse)
+def get_articles(request: Request, limit: int = 50, days: int = 7, collapse: bool = False,
+                 cursor: Optional[str] = None, fields: Optional[str] = None):
     """
     Get recent gold news articles
+
+    Articles are returned without their body; `fields=title,link,...` selects any fields
+    of the Article model instead. With collapse=true only the best-ranked article of each
+    story cluster is returned. When more articles follow, the X-Next-Cursor header (and a
+    Link rel="next") carries an opaque cursor; pass it back as `cursor` with the same
+    parameters for the next page. Conditional requests (If-None-Match / If-Modified-Since)
+    are answered with 304 from the in-memory cache without touching storage.
     """
+    limit = min(max(limit, 1), 500)
+    selected = parse_fields(fields)
     try:
-        if Path(JSON_DB_PATH).exists():
-            with open(JSON_DB_PATH, 'r') as f:
-                articles = json.load(f)
-        else:
-            articles = []
-        
-        # Filter by date if requested
-        if days > 0:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            articles = [
-                article for article in articles
-                if article.get('fetched_at', '') > cutoff_date
-            ]
-        
-        # Sort by score and date
-        articles.sort(key=lambda x: (x.get('score', 0), x.get('fetched_at', '')), reverse=True)
-        
-        # Limit results
-        return articles[:limit]
+        articles, next_cursor, etag, last_modified = ranked_articles(
+            limit=limit, days=days, collapse=collapse, cursor=cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching articles: {str(e)}")
+    etag = make_etag(etag, selected)
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+    def render() -> bytes:
+        # The cached records were validated when they were stored; serialize them directly
+        records = [{name: article.get(name) for name in selected} for article in articles]
+        if 'content' in selected:
+            # Bodies live in the blob store and are only loaded when explicitly requested
+            store = get_store()
+            for record, article in zip(records, articles):
+                record['content'] = store.load_content(article)
+        return json_bytes(records)
+
+    return cached_response(request, etag, last_modified, render, "application/json", headers)
+
+@app.get("/articles/{article_id}", response_model=Article)
+def get_article(request: Request, article_id: str):
+    """
+    Get a single article, including its body, by its stable ID
+    """
+    snapshot = get_article_cache().snapshot()
+    article = snapshot.index.get_by_id(article_id)
+    if article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    etag = make_etag("article", snapshot.version, article_id)
+    return cached_response(
+        request, etag, snapshot.loaded_at,
+        lambda: json_bytes(Article(**{**article, 'content': get_store().load_content(article)}).model_dump()),
+        "application/json"
+    )
+
+@app.get("/search", response_model=SearchResponse)
+def search_articles(request: Request, q: str, page: int = 1, page_size: int = 20):
+    """
+    Full-text search over article titles and bodies
+
+    Words are ANDed together and "quoted phrases" match exactly. Results are ranked by
+    BM25 with title matches weighted higher, and carry a snippet with <mark> highlights.
+    Results only change with the store, so conditional requests are answered with 304
+    and repeated searches are served from the response cache.
+    """
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    snapshot = get_article_cache().snapshot()
+    etag = make_etag("search", snapshot.version, q, page, page_size)
+
+    def render() -> bytes:
+        try:
+            total, results = get_store().search(q, limit=page_size, offset=(page - 1) * page_size)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error searching articles: {str(e)}")
+        return json_bytes(SearchResponse(
+            query=q, total=total, page=page, page_size=page_size, results=results
+        ).model_dump())
+
+    return cached_response(request, etag, snapshot.loaded_at, render, "application/json")
+
+@app.get("/archive")
+def stream_archive(since: Optional[str] = None, until: Optional[str] = None, source: Optional[str] = None):
+    """
+    Stream archived (expired) articles as newline-delimited JSON
+
+    Articles fetched in (since, until] are read segment by segment from the compressed
+    day-partitioned archive, oldest first, without loading the whole archive into memory.
+    """
+    def lines():
+        for article in get_archive().iter_range(since=since, until=until, source=source):
+            yield json.dumps(article, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/events")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events stream of newly ingested articles
+
+    Each `articles` event carries the summaries of the articles added by one store
+    commit, with the store version as its id; reconnecting clients get the events they
+    missed via Last-Event-ID. A comment line is sent as heartbeat while idle, and a
+    client too slow to keep up gets a `reset` event instead of an unbounded backlog.
+    """
+    return StreamingResponse(
+        get_broker().stream(last_event_id=request.headers.get('last-event-id')),
+        media_type="text/event-stream",
+        # Never cached, and not buffered by nginx
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/scrape", response_model=ScrapeResponse)
 async def scrape_now(background_tasks: BackgroundTasks):
@@ -173,8 +483,9 @@ async def scrape_now(background_tasks: BackgroundTasks):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting scrape job: {str(e)}")
 
-# Register the format_date filter with Jinja2
+# Register the format_date filter and the request-independent url_for with Jinja2
 templates.env.filters["format_date"] = format_date
+templates.env.globals["url_for"] = page_url
 
 if __name__ == "__main__":
     # Ensure log directory exists
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+文章归档层 - 保留策略删除的文章按抓取日期写入压缩的只读分段文件
+每次归档为每个日期写一个新分段（gzip，安装了 zstandard 时可选zstd），从不修改已有分段；
+manifest.json 记录每个分段的日期和时间范围，按时间范围读取时只打开相关分段并逐行解压
+"""
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from app.config import ARCHIVE_DIR, ARCHIVE_COMPRESSION
+from app.storage import FileLock, atomic_write
+
+logger = logging.getLogger("archive")
+
+_SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def _article_day(article: Dict) -> str:
+    """分区日期：抓取时间的日期部分"""
+    fetched_at = article.get('fetched_at') or ''
+    try:
+        return datetime.fromisoformat(fetched_at[:10]).strftime("%Y-%m-%d")
+    except ValueError:
+        return datetime.now().strftime("%Y-%m-%d")
+
+
+class ArticleArchive:
+    """按日期分区的压缩文章归档"""
+
+    def __init__(self, root: Path = ARCHIVE_DIR, compression: str = ARCHIVE_COMPRESSION):
+        if compression == "zstd" and zstandard is None:
+            logger.warning("未安装 zstandard，归档改用gzip压缩")
+            compression = "gzip"
+        if compression not in _SUFFIXES:
+            raise ValueError(f"不支持的归档压缩格式: {compression}")
+        self.root = Path(root)
+        self.compression = compression
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = FileLock(self.root / "manifest.lock")
+
+    def manifest(self) -> List[Dict]:
+        """全部分段的描述，按日期排序"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('segments', [])
+        except FileNotFoundError:
+            return []
+
+    def _write_segment(self, path: Path, articles: List[Dict]) -> int:
+        """把文章写入新分段（临时文件+rename），返回压缩后的字节数"""
+        data = ''.join(json.dumps(article, ensure_ascii=False) + '\n' for article in articles).encode('utf-8')
+        if self.compression == "zstd":
+            data = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            data = gzip.compress(data, compresslevel=9)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+        return len(data)
+
+    def archive(self, articles: Iterable[Dict]) -> int:
+        """按抓取日期分组写入新分段并更新清单，返回归档的文章数"""
+        days: Dict[str, List[Dict]] = {}
+        for article in articles:
+            days.setdefault(_article_day(article), []).append(article)
+        if not days:
+            return 0
+
+        with self._lock:
+            segments = self.manifest()
+            stamp = f"{time.time_ns():x}"
+            for day, group in sorted(days.items()):
+                group.sort(key=lambda x: x.get('fetched_at', ''))
+                relative = Path(*day.split('-')) / f"{stamp}{_SUFFIXES[self.compression]}"
+                size = self._write_segment(self.root / relative, group)
+                segments.append({
+                    'file': relative.as_posix(),
+                    'day': day,
+                    'min_fetched_at': group[0].get('fetched_at', ''),
+                    'max_fetched_at': group[-1].get('fetched_at', ''),
+                    'count': len(group),
+                    'bytes': size
+                })
+            segments.sort(key=lambda x: (x['day'], x['file']))
+            atomic_write(self.manifest_path, json.dumps({'segments': segments}, ensure_ascii=False, indent=2))
+
+        count = sum(len(group) for group in days.values())
+        logger.info(f"归档了 {count} 篇文章，涉及 {len(days)} 个日期分区")
+        return count
+
+    def _read_segment(self, relative: str) -> Iterator[Dict]:
+        path = self.root / relative
+        with open(path, 'rb') as raw:
+            if path.name.endswith(_SUFFIXES["zstd"]):
+                if zstandard is None:
+                    raise RuntimeError(f"读取 {relative} 需要安装 zstandard")
+                stream = zstandard.ZstdDecompressor().stream_reader(raw)
+            else:
+                stream = gzip.GzipFile(fileobj=raw)
+            for line in io.TextIOWrapper(stream, encoding='utf-8'):
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_range(self, since: Optional[str] = None, until: Optional[str] = None,
+                   source: Optional[str] = None) -> Iterator[Dict]:
+        """
+        逐篇读取抓取时间在 (since, until] 内的归档文章，按日期从旧到新
+        只打开时间范围与之重叠的分段，每次只在内存中保留一行
+        """
+        for segment in self.manifest():
+            if since is not None and segment['max_fetched_at'] <= since:
+                continue
+            if until is not None and segment['min_fetched_at'] > until:
+                continue
+            for article in self._read_segment(segment['file']):
+                fetched_at = article.get('fetched_at', '')
+                if since is not None and fetched_at <= since:
+                    continue
+                if until is not None and fetched_at > until:
+                    continue
+                if source is not None and article.get('source') != source:
+                    continue
+                yield article
+
+    def stats(self) -> Dict:
+        segments = self.manifest()
+        return {
+            'segments': len(segments),
+            'articles': sum(segment['count'] for segment in segments),
+            'bytes': sum(segment['bytes'] for segment in segments),
+            'first_day': segments[0]['day'] if segments else None,
+            'last_day': segments[-1]['day'] if segments else None
+        }
+
+
+_archive: Optional[ArticleArchive] = None
+
+
+def get_archive() -> ArticleArchive:
+    """进程内共享的归档"""
+    global _archive
+    if _archive is None:
+        _archive = ArticleArchive()
+    return _archive
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+进程内文章缓存 - Web服务的读请求直接使用内存中解析好、按抓取时间排好序的文章
+只有文章库版本号变化时才重新加载；版本号最多每 ARTICLE_CACHE_CHECK_SECONDS 秒检查一次
+重新加载时只把变化的文章增量更新到有序索引（app/article_index.py），不重新排序
+每篇文章带有由规范URL得到的稳定ID（'id' 字段），详情页按ID在哈希表中查找
+缓存中的文章由所有请求共享，只读；需要修改时先复制
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.article_index import ArticleIndex
+from app.article_store import get_store
+from app.config import ARTICLE_CACHE_CHECK_SECONDS
+from app.url_canonical import article_id
+
+logger = logging.getLogger("article_cache")
+
+
+class CacheSnapshot:
+    """某个库版本的全部文章及其索引，以及由它们派生的数据"""
+
+    def __init__(self, version: int, index: ArticleIndex):
+        self.version = version
+        self.index = index
+        self.articles = index.by_time()
+        # 本版本在本进程中首次可见的时间，用作HTTP响应的 Last-Modified
+        self.loaded_at = time.time()
+        self._derived: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def derive(self, name: str, key: Hashable, compute: Callable[[List[Dict]], Any]) -> Any:
+        """
+        由文章派生的数据（例如排序结果），按 name 缓存到本快照失效为止
+        key 表示派生数据依赖的其他状态（例如BM25索引的代数），变化时重新计算
+        """
+        with self._lock:
+            cached = self._derived.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+        value = compute(self.articles)
+        with self._lock:
+            self._derived[name] = (key, value)
+        return value
+
+
+class ArticleCache:
+    """文章库的进程内只读缓存"""
+
+    def __init__(self, store=None, check_interval: float = ARTICLE_CACHE_CHECK_SECONDS):
+        self.store = store if store is not None else get_store()
+        self.check_interval = check_interval
+        self._snapshot: Optional[CacheSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> CacheSnapshot:
+        """当前快照；距上次检查超过 check_interval 时才读取库版本号"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self.store.version():
+                start = time.perf_counter()
+                version, articles = self.store.load_versioned()
+                articles = self._with_ids(articles, snapshot.index if snapshot is not None else None)
+                if snapshot is None:
+                    index = ArticleIndex(articles)
+                    changed = len(index)
+                else:
+                    index, changed = self._apply_changes(snapshot.index, articles)
+                snapshot = CacheSnapshot(version, index)
+                self._snapshot = snapshot
+                elapsed = (time.perf_counter() - start) * 1000
+                logger.info(
+                    f"文章缓存已刷新到版本 {version}，{len(index)} 篇文章，"
+                    f"{changed} 篇变化，用时 {elapsed:.1f} 毫秒"
+                )
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    @staticmethod
+    def _with_ids(articles: List[Dict], previous: Optional[ArticleIndex]) -> List[Dict]:
+        """给文章加上稳定ID；已缓存的链接沿用旧ID，不重复计算规范URL"""
+        result = []
+        for article in articles:
+            link = article.get('link')
+            if not link:
+                continue
+            cached = previous.get(link) if previous is not None else None
+            result.append({**article, 'id': cached['id'] if cached is not None else article_id(link)})
+        return result
+
+    @staticmethod
+    def _apply_changes(previous: ArticleIndex, articles: List[Dict]) -> Tuple[ArticleIndex, int]:
+        """在旧索引的副本上只更新新增、修改和删除的文章，返回 (新索引, 变化的文章数)"""
+        index = previous.copy()
+        links = set()
+        changed = 0
+        for article in articles:
+            link = article.get('link')
+            if not link:
+                continue
+            links.add(link)
+            if previous.get(link) != article:
+                index.add(article)
+                changed += 1
+        for article in previous.by_time():
+            if article['link'] not in links:
+                index.remove(article['link'])
+                changed += 1
+        return index, changed
+
+    def invalidate(self) -> None:
+        """下次读取时重新检查库版本号（本进程刚写入后调用）"""
+        self._checked_at = 0.0
+
+    def version(self) -> int:
+        return self.snapshot().version
+
+    def articles(self) -> List[Dict]:
+        """全部文章（新 -> 旧）"""
+        return self.snapshot().articles
+
+    def index(self) -> ArticleIndex:
+        return self.snapshot().index
+
+    def recent(self, days: float, source: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """最近若干天内抓取的文章（新 -> 旧），可限定来源；二分查找，与库的大小无关"""
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        if source is not None:
+            return self.index().by_time(since=since, field='source', value=source, limit=limit)
+        return self.index().by_time(since=since, limit=limit)
+
+    def by_source(self, source: str, limit: Optional[int] = None) -> List[Dict]:
+        """某个来源的全部文章（新 -> 旧）"""
+        return self.index().by_time(field='source', value=source, limit=limit)
+
+    def get_by_link(self, link: str) -> Optional[Dict]:
+        return self.index().get(link)
+
+    def get_by_id(self, article_id: str) -> Optional[Dict]:
+        return self.index().get_by_id(article_id)
+
+
+_cache: Optional[ArticleCache] = None
+
+
+def get_article_cache() -> ArticleCache:
+    """进程内共享的文章缓存"""
+    global _cache
+    if _cache is None:
+        _cache = ArticleCache()
+    return _cache
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+文章的有序二级索引 - 按分数排序的列表、可二分查找的抓取时间列表和按字段（来源、故事簇）的倒排列表
+分数列表另按抓取日期分桶，"最近N天按分数" 只归并窗口内的 N+1 个桶
+插入和删除为一次二分查找加列表移动；"最近N天" / "某来源" / "前N篇" 查询为 O(log n + k)
+文章带有稳定ID（'id' 字段）时另有 ID -> 链接 的哈希表，按ID查找为 O(1)
+"""
+import bisect
+import heapq
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# (抓取时间, 链接)
+TimeKey = Tuple[str, str]
+# (分数, 抓取时间, 链接)
+ScoreKey = Tuple[float, str, str]
+
+
+def _score(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _day(fetched_at: str) -> str:
+    """分数分桶的键：ISO时间的日期部分"""
+    return fetched_at[:10]
+
+
+def _remove(keys: List, key) -> None:
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+class ArticleIndex:
+    """增量维护的文章索引，文章以链接为主键"""
+
+    def __init__(self, articles: Iterable[Dict] = (),
+                 score_field: str = 'score',
+                 posting_fields: Sequence[str] = ('source', 'cluster_id')):
+        self.score_field = score_field
+        self.posting_fields = tuple(posting_fields)
+        self._articles: Dict[str, Dict] = {}
+        self._ids: Dict[str, str] = {}
+        self._by_time: List[TimeKey] = []
+        self._by_score: List[ScoreKey] = []
+        # 抓取日期 -> 当天文章按分数排序的键；_days 为有序的日期列表
+        self._score_days: Dict[str, List[ScoreKey]] = {}
+        self._days: List[str] = []
+        self._postings: Dict[str, Dict[str, List[TimeKey]]] = {field: {} for field in self.posting_fields}
+
+        # 初次建立时整体排序，比逐篇插入快
+        for article in articles:
+            if article.get('link'):
+                self._articles[article['link']] = article
+        for link, article in self._articles.items():
+            if article.get('id'):
+                self._ids[article['id']] = link
+            self._by_time.append(self._time_key(article))
+            score_key = self.score_key(article)
+            self._by_score.append(score_key)
+            self._score_days.setdefault(_day(score_key[1]), []).append(score_key)
+            for field in self.posting_fields:
+                value = article.get(field)
+                if value:
+                    self._postings[field].setdefault(value, []).append(self._time_key(article))
+        self._by_time.sort()
+        self._by_score.sort()
+        for keys in self._score_days.values():
+            keys.sort()
+        self._days = sorted(self._score_days)
+        for postings in self._postings.values():
+            for keys in postings.values():
+                keys.sort()
+
+    def _time_key(self, article: Dict) -> TimeKey:
+        return (article.get('fetched_at') or '', article['link'])
+
+    def score_key(self, article: Dict) -> ScoreKey:
+        """文章在分数顺序中的位置，可作为 by_score 的续读位置"""
+        return (_score(article.get(self.score_field)), article.get('fetched_at') or '', article['link'])
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+    def __contains__(self, link: str) -> bool:
+        return link in self._articles
+
+    def get(self, link: str) -> Optional[Dict]:
+        return self._articles.get(link)
+
+    def get_by_id(self, article_id: str) -> Optional[Dict]:
+        link = self._ids.get(article_id)
+        return self._articles.get(link) if link is not None else None
+
+    def copy(self) -> "ArticleIndex":
+        """浅复制（只复制键列表），用于在不影响正在读取的旧索引的情况下应用增量"""
+        clone = ArticleIndex.__new__(ArticleIndex)
+        clone.score_field = self.score_field
+        clone.posting_fields = self.posting_fields
+        clone._articles = dict(self._articles)
+        clone._ids = dict(self._ids)
+        clone._by_time = list(self._by_time)
+        clone._by_score = list(self._by_score)
+        clone._score_days = {day: list(keys) for day, keys in self._score_days.items()}
+        clone._days = list(self._days)
+        clone._postings = {
+            field: {value: list(keys) for value, keys in postings.items()}
+            for field, postings in self._postings.items()
+        }
+        return clone
+
+    # 增量维护
+
+    def add(self, article: Dict) -> None:
+        """加入文章；同一链接已存在时替换"""
+        link = article.get('link')
+        if not link:
+            return
+        if link in self._articles:
+            self.remove(link)
+        self._articles[link] = article
+        if article.get('id'):
+            self._ids[article['id']] = link
+        time_key = self._time_key(article)
+        bisect.insort(self._by_time, time_key)
+        score_key = self.score_key(article)
+        bisect.insort(self._by_score, score_key)
+        day = _day(score_key[1])
+        if day not in self._score_days:
+            self._score_days[day] = []
+            bisect.insort(self._days, day)
+        bisect.insort(self._score_days[day], score_key)
+        for field in self.posting_fields:
+            value = article.get(field)
+            if value:
+                bisect.insort(self._postings[field].setdefault(value, []), time_key)
+
+    def remove(self, link: str) -> None:
+        article = self._articles.pop(link, None)
+        if article is None:
+            return
+        if self._ids.get(article.get('id')) == link:
+            del self._ids[article['id']]
+        time_key = self._time_key(article)
+        _remove(self._by_time, time_key)
+        score_key = self.score_key(article)
+        _remove(self._by_score, score_key)
+        day = _day(score_key[1])
+        keys = self._score_days.get(day)
+        if keys is not None:
+            _remove(keys, score_key)
+            if not keys:
+                del self._score_days[day]
+                _remove(self._days, day)
+        for field in self.posting_fields:
+            value = article.get(field)
+            keys = self._postings[field].get(value) if value else None
+            if keys is not None:
+                _remove(keys, time_key)
+                if not keys:
+                    del self._postings[field][value]
+
+    # 查询
+
+    def _time_range(self, keys: List[TimeKey], since: Optional[str]) -> int:
+        """抓取时间晚于 since 的第一个位置"""
+        # (since, '\uffff') 排在所有抓取时间等于 since 的键之后
+        return bisect.bisect_right(keys, (since, '\uffff')) if since is not None else 0
+
+    def by_time(self, since: Optional[str] = None,
+                field: Optional[str] = None, value: Optional[str] = None,
+                limit: Optional[int] = None, until: Optional[str] = None) -> List[Dict]:
+        """抓取时间在 (since, until] 内的文章（新 -> 旧），可限定某个字段值（例如来源）"""
+        keys = self._postings[field].get(value, []) if field is not None else self._by_time
+        start = self._time_range(keys, since)
+        end = self._time_range(keys, until) if until is not None else len(keys)
+        stop = start if limit is None else max(start, end - limit)
+        return [self._articles[link] for _, link in reversed(keys[stop:end])]
+
+    def count(self, field: Optional[str] = None, value: Optional[str] = None,
+              since: Optional[str] = None) -> int:
+        """抓取时间晚于 since 的文章数，可限定某个字段值"""
+        keys = self._postings[field].get(value, []) if field is not None else self._by_time
+        return len(keys) - self._time_range(keys, since)
+
+    def by_score(self, since: Optional[str] = None, after: Optional[ScoreKey] = None) -> Iterator[Dict]:
+        """
+        按分数从高到低（同分时新文章在前）逐篇返回，跳过抓取时间不晚于 since 的文章
+        after 为上一页最后一篇的 score_key，从它之后继续，二分定位，与页数无关
+        有 since 时只归并抓取日期不早于 since 当天的分数桶，窗口外的文章不会被扫描
+        """
+        if since is None:
+            buckets = [self._by_score]
+        else:
+            first = bisect.bisect_left(self._days, _day(since))
+            buckets = [self._score_days[day] for day in self._days[first:]]
+
+        def descending(keys: List[ScoreKey]) -> Iterator[ScoreKey]:
+            stop = bisect.bisect_left(keys, after) if after is not None else len(keys)
+            return (keys[i] for i in range(stop - 1, -1, -1))
+
+        for _, fetched_at, link in heapq.merge(*map(descending, buckets), reverse=True):
+            # 只有 since 当天的桶里会有不晚于 since 的文章
+            if since is None or fetched_at > since:
+                yield self._articles[link]
+
+    def best(self, field: str, value: str, since: Optional[str] = None) -> Optional[Dict]:
+        """某个字段值（例如故事簇）下抓取时间晚于 since 的分数最高的文章"""
+        keys = self._postings[field].get(value, [])
+        articles = (self._articles[link] for _, link in keys[self._time_range(keys, since):])
+        return max(articles, key=self.score_key, default=None)
+
+    def neighbours(self, link: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """按抓取时间相邻的 (较新的文章, 较旧的文章)"""
+        article = self._articles.get(link)
+        if article is None:
+            return None, None
+        i = bisect.bisect_left(self._by_time, self._time_key(article))
+        newer = self._articles[self._by_time[i + 1][1]] if i + 1 < len(self._by_time) else None
+        older = self._articles[self._by_time[i - 1][1]] if i > 0 else None
+        return newer, older
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+统一的文章库接口 - 所有组件通过 get_store() 读写文章
+底层后端（JSON / JSONL日志 / SQLite）由 STORAGE_TYPE 决定，只保存元数据；
+正文在提交时写入内容寻址存储（app/blob_store.py），文章中只保留 content_ref 和 content_length，
+需要正文的读取方传入 with_content=True 或调用 load_content
+每次提交后检查内容质量规则并同步更新全文索引和BM25相关性索引，保留策略见 app/retention.py
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.bm25_index import get_index
+from app.blob_store import BlobStore, get_blob_store
+from app.retention import RetentionEngine
+from app.search_index import SearchIndex, get_search_index
+from app.storage import get_storage
+
+logger = logging.getLogger("article_store")
+
+
+class ArticleStore:
+    """文章库：批量写入、按链接查找、时间/分数区间查询、流式遍历和保留策略"""
+
+    def __init__(self, backend=None,
+                 retention: Optional[RetentionEngine] = None,
+                 search_index: Optional[SearchIndex] = None,
+                 blobs: Optional[BlobStore] = None):
+        self.backend = backend if backend is not None else get_storage()
+        self.retention = retention if retention is not None else RetentionEngine()
+        self.search_index = search_index if search_index is not None else get_search_index()
+        self.blobs = blobs if blobs is not None else get_blob_store()
+
+    # 正文
+
+    def load_content(self, article: Dict) -> str:
+        """读取文章正文；尚未迁移的旧文章直接返回内联的 content"""
+        ref = article.get('content_ref')
+        if ref:
+            return self.blobs.get(ref) or ''
+        return article.get('content') or ''
+
+    def _with_content(self, articles: Iterable[Dict]) -> Iterator[Dict]:
+        for article in articles:
+            yield {**article, 'content': self.load_content(article)}
+
+    def _externalize(self, article: Dict) -> Dict:
+        """把文章（或字段修改）中的正文写入内容寻址存储，换成引用；不修改传入的字典"""
+        if 'content' not in article:
+            return article
+        article = dict(article)
+        content = article.pop('content') or ''
+        article['content_ref'] = self.blobs.put(content) if content else None
+        article['content_length'] = len(content)
+        return article
+
+    # 读取
+
+    def version(self) -> int:
+        """每次提交递增的版本号"""
+        return self.backend.version()
+
+    def count(self) -> int:
+        return self.backend.count()
+
+    def source_counts(self) -> Dict[Optional[str], int]:
+        """每个来源的文章数，不读取文章"""
+        return self.backend.source_counts()
+
+    def load_all(self, with_content: bool = False) -> List[Dict]:
+        """全部文章（新文章在前）"""
+        articles = self.backend.load_all()
+        return list(self._with_content(articles)) if with_content else articles
+
+    def load_versioned(self, with_content: bool = False) -> Tuple[int, List[Dict]]:
+        """全部文章及读取时的版本号，写回时作为 expected_version 传入 commit"""
+        version, articles = self.backend.load_versioned()
+        return version, list(self._with_content(articles)) if with_content else articles
+
+    def get_by_link(self, link: str, with_content: bool = False) -> Optional[Dict]:
+        article = self.backend.get_by_link(link)
+        if article is not None and with_content:
+            article = {**article, 'content': self.load_content(article)}
+        return article
+
+    def get_many(self, links: Iterable[str], with_content: bool = False) -> List[Dict]:
+        """按链接批量查找，不存在的链接被忽略"""
+        articles = self.backend.get_many(links)
+        return list(self._with_content(articles)) if with_content else articles
+
+    def query(self,
+              since: Optional[str] = None,
+              until: Optional[str] = None,
+              min_score: Optional[float] = None,
+              max_score: Optional[float] = None,
+              source: Optional[str] = None,
+              order_by: Optional[str] = None,
+              descending: bool = True,
+              limit: Optional[int] = None) -> List[Dict]:
+        """
+        区间查询：抓取时间 (since, until]、分数 [min_score, max_score]、来源
+        order_by 可选 fetched_at / pub_date / score
+        """
+        return self.backend.query(
+            since=since, until=until,
+            min_score=min_score, max_score=max_score,
+            source=source,
+            order_by=order_by, descending=descending, limit=limit
+        )
+
+    def recent(self, days: float, **filters) -> List[Dict]:
+        """最近若干天内抓取的文章"""
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        return self.query(since=since, **filters)
+
+    def iter_articles(self, batch_size: int = 500, with_content: bool = False) -> Iterator[Dict]:
+        """按新 -> 旧流式遍历，不需要一次性把整个库载入内存"""
+        articles = self.backend.iter_articles(batch_size)
+        return self._with_content(articles) if with_content else articles
+
+    # 写入
+
+    def commit(self, upserts: Iterable[Dict] = (), deletes: Iterable[str] = (),
+               patches: Iterable[Dict] = (), expected_version: Optional[int] = None) -> int:
+        """一次提交插入/替换、字段修改和删除，返回新版本号"""
+        upserts = [self._externalize(article) for article in upserts]
+        patches = [self._externalize(patch) for patch in patches]
+        deletes = list(deletes)
+        version = self.backend.commit(
+            upserts=upserts, deletes=deletes, patches=patches, expected_version=expected_version
+        )
+        if not (upserts or deletes or patches):
+            return version
+
+        # 新增或修改后的文章命中内容质量规则时删除
+        changed = self.get_many(
+            {article.get('link') for article in upserts + patches if article.get('link')},
+            with_content=True
+        )
+        rejected = self.retention.rejected(changed)
+        if rejected:
+            version = self.backend.delete_links(rejected)
+            changed = [article for article in changed if article.get('link') not in rejected]
+            deletes = deletes + list(rejected)
+
+        self._update_search_index(changed, deletes, version)
+        self._update_relevance_index(changed, deletes)
+        return version
+
+    def upsert_many(self, articles: Iterable[Dict]) -> int:
+        return self.commit(upserts=articles)
+
+    def update_fields(self, patches: Iterable[Dict]) -> int:
+        """只修改给定字段，每项为 {'link': ..., 字段: 值}"""
+        return self.commit(patches=patches)
+
+    def delete_links(self, links: Iterable[str]) -> int:
+        return self.commit(deletes=links)
+
+    # 全文检索
+
+    def _update_search_index(self, changed: List[Dict], deletes: List[str], version: int) -> None:
+        """把本次提交同步到全文索引；失败只记录日志，下次检索时会按版本号重建"""
+        try:
+            self.search_index.update(changed, deletes=deletes, version=version)
+        except Exception as e:
+            logger.error(f"更新全文索引时出错: {e}")
+
+    def _update_relevance_index(self, changed: List[Dict], deletes: List[str]) -> None:
+        """重新索引内容变化的文章（字段修改只改了无关字段时不重新索引）；失败时排序前会补上"""
+        try:
+            index = get_index()
+            index.add_missing(changed)
+            if deletes:
+                index.remove_links(deletes)
+        except Exception as e:
+            logger.error(f"更新BM25索引时出错: {e}")
+
+    def rebuild_search_index(self) -> int:
+        """从文章库完整重建全文索引，返回索引的文章数"""
+        version = self.version()
+        return self.search_index.rebuild(self.iter_articles(with_content=True), version=version)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """全文检索标题和正文，返回 (命中总数, 当前页结果)"""
+        if self.search_index.indexed_version() != self.version():
+            # 索引从未建立，或有写入没有同步到索引（例如库被替换）
+            self.rebuild_search_index()
+        return self.search_index.search(query, limit=limit, offset=offset)
+
+    # 保留策略
+
+    def expired_links(self, articles: Optional[Iterable[Dict]] = None) -> Set[str]:
+        """
+        按保留策略返回应删除的链接（不删除）
+        传入 articles 时对其计算（可以包含尚未入库的新文章），否则对整个库计算
+        """
+        return self.retention.expired(self.iter_articles(with_content=True) if articles is None else articles)
+
+    def apply_retention(self, full: bool = False) -> Set[str]:
+        """执行保留策略，返回被删除的链接；默认只处理即将过期的文章，full=True 时重新评估全库"""
+        return self.retention.run(self, full=full)
+
+    def collect_garbage(self) -> int:
+        """删除不再被任何文章引用的正文文件，返回删除的文件数"""
+        live = {article.get('content_ref') for article in self.iter_articles()}
+        return self.blobs.gc(ref for ref in live if ref)
+
+    def externalize_bodies(self) -> int:
+        """把旧文章中内联的正文迁移到内容寻址存储，返回迁移的文章数"""
+        version, articles = self.backend.load_versioned()
+        legacy = [article for article in articles if 'content' in article]
+        if legacy:
+            # 整篇替换才能去掉内联的 content 字段；期间有并发写入时合并，下次运行再处理
+            self.commit(upserts=legacy, expected_version=version)
+            logger.info(f"把 {len(legacy)} 篇文章的正文迁移到了内容寻址存储")
+        return len(legacy)
+
+
+_store: Optional[ArticleStore] = None
+
+
+def get_store() -> ArticleStore:
+    """进程内共享的文章库"""
+    global _store
+    if _store is None:
+        _store = ArticleStore()
+    return _store
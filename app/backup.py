@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+增量备份 - 定期写一个完整的基础快照，之后每次只写与上次备份相比新增、修改和删除的文章
+每个备份链为 BACKUP_DIR 下的一个目录：base.jsonl.gz + 若干 delta-<版本号>.jsonl.gz，
+链中增量数达到 BACKUP_DELTAS_PER_BASE 时开始新的备份链，只保留最近 BACKUP_KEEP_CHAINS 条链
+备份文件第一行是 {"version": 库版本号}，之后每行一条 {"op": "upsert", "article": ...} 或 {"op": "delete", "link": ...}
+"""
+import gzip
+import hashlib
+import json
+import logging
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.article_store import get_store
+from app.config import BACKUP_DIR, BACKUP_DELTAS_PER_BASE, BACKUP_KEEP_CHAINS
+from app.storage import FileLock, atomic_write
+
+logger = logging.getLogger("backup")
+
+
+def _fingerprint(article: Dict) -> str:
+    """库中文章的指纹；正文以 content_ref 的形式包含在内，不需要读取正文"""
+    return hashlib.sha1(json.dumps(article, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _write_records(path: Path, version: int, records: Iterable[Dict]) -> int:
+    """写入gzip压缩的备份文件（临时文件+rename），返回记录数"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    count = 0
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'version': version}) + '\n')
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    tmp_path.replace(path)
+    return count
+
+
+def _read_records(path: Path) -> Tuple[int, List[Dict]]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        version = json.loads(f.readline())['version']
+        return version, [json.loads(line) for line in f if line.strip()]
+
+
+class BackupManager:
+    """文章库的增量备份和恢复"""
+
+    def __init__(self, store=None, root: Path = BACKUP_DIR,
+                 deltas_per_base: int = BACKUP_DELTAS_PER_BASE,
+                 keep_chains: int = BACKUP_KEEP_CHAINS):
+        self.store = store if store is not None else get_store()
+        self.root = Path(root)
+        self.deltas_per_base = deltas_per_base
+        self.keep_chains = keep_chains
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = FileLock(self.root / "backup.lock")
+
+    # 清单
+
+    def chains(self) -> List[Dict]:
+        """全部备份链，从旧到新"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('chains', [])
+        except FileNotFoundError:
+            return []
+
+    def _save_chains(self, chains: List[Dict]) -> None:
+        atomic_write(self.manifest_path, json.dumps({'chains': chains}, ensure_ascii=False, indent=2))
+
+    def _load_fingerprints(self, chain: Dict) -> Dict[str, str]:
+        with gzip.open(self.root / chain['dir'] / "fingerprints.json.gz", 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_fingerprints(self, chain: Dict, fingerprints: Dict[str, str]) -> None:
+        path = self.root / chain['dir'] / "fingerprints.json.gz"
+        tmp_path = path.with_name(path.name + '.tmp')
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(fingerprints, f)
+        tmp_path.replace(path)
+
+    # 备份
+
+    def backup(self, full: bool = False) -> Optional[Dict]:
+        """
+        备份文章库，返回本次写入的备份描述；库自上次备份后没有变化时返回None
+        full=True 或当前备份链的增量数已满时写新的基础快照，否则只写增量
+        """
+        with self._lock:
+            chains = self.chains()
+            chain = chains[-1] if chains else None
+            if chain is not None and not full and self.store.version() == chain['version']:
+                logger.info("文章库自上次备份后没有变化")
+                return None
+
+            version, articles = self.store.load_versioned()
+            current = {article['link']: _fingerprint(article) for article in articles if article.get('link')}
+
+            if full or chain is None or len(chain['deltas']) >= self.deltas_per_base:
+                entry = self._write_base(version, current)
+                chains.append(entry['chain'])
+                chains = self._rotate(chains)
+            else:
+                entry = self._write_delta(chain, version, current)
+            self._save_chains(chains)
+
+        if entry is None:
+            logger.info("文章库自上次备份后没有变化")
+            return None
+        logger.info(
+            f"备份完成: {entry['file']}，版本 {version}，"
+            f"{entry['upserts']} 篇写入，{entry['deletes']} 篇删除"
+        )
+        return entry
+
+    def _write_base(self, version: int, current: Dict[str, str]) -> Dict:
+        """写入新的备份链和基础快照"""
+        directory = f"chain-{datetime.now().strftime('%Y%m%d_%H%M%S')}-{version}"
+        (self.root / directory).mkdir(parents=True, exist_ok=True)
+        articles = self.store.get_many(current, with_content=True)
+        count = _write_records(
+            self.root / directory / "base.jsonl.gz", version,
+            ({'op': 'upsert', 'article': article} for article in articles)
+        )
+        chain = {
+            'dir': directory,
+            'base_version': version,
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'deltas': []
+        }
+        self._save_fingerprints(chain, {article['link']: current[article['link']] for article in articles})
+        return {'chain': chain, 'file': f"{directory}/base.jsonl.gz", 'upserts': count, 'deletes': 0}
+
+    def _write_delta(self, chain: Dict, version: int, current: Dict[str, str]) -> Optional[Dict]:
+        """只写入与上次备份相比变化的文章；只有变化的文章需要读取正文，没有变化时返回None"""
+        previous = self._load_fingerprints(chain)
+        changed = [link for link, fingerprint in current.items() if previous.get(link) != fingerprint]
+        deleted = [link for link in previous if link not in current]
+        chain['version'] = version
+        if not changed and not deleted:
+            return None
+
+        articles = self.store.get_many(changed, with_content=True)
+        records = [{'op': 'upsert', 'article': article} for article in articles]
+        records += [{'op': 'delete', 'link': link} for link in deleted]
+        name = f"delta-{version}.jsonl.gz"
+        _write_records(self.root / chain['dir'] / name, version, records)
+
+        fingerprints = {link: fingerprint for link, fingerprint in previous.items() if link in current}
+        fingerprints.update({article['link']: current[article['link']] for article in articles})
+        self._save_fingerprints(chain, fingerprints)
+
+        delta = {
+            'file': name,
+            'version': version,
+            'upserts': len(articles),
+            'deletes': len(deleted),
+            'created_at': datetime.now().isoformat()
+        }
+        chain['deltas'].append(delta)
+        return {**delta, 'file': f"{chain['dir']}/{name}"}
+
+    def _rotate(self, chains: List[Dict]) -> List[Dict]:
+        """只保留最近的若干条备份链"""
+        if len(chains) <= self.keep_chains:
+            return chains
+        for chain in chains[:-self.keep_chains]:
+            shutil.rmtree(self.root / chain['dir'], ignore_errors=True)
+            logger.info(f"删除了旧的备份链 {chain['dir']}")
+        return chains[-self.keep_chains:]
+
+    # 恢复
+
+    def load(self, version: Optional[int] = None) -> Tuple[int, List[Dict]]:
+        """
+        从备份中重建文章集合，返回 (版本号, 文章)
+        默认恢复到最新的备份；指定 version 时恢复到不晚于该版本的最近一次备份
+        """
+        chains = [chain for chain in self.chains() if version is None or chain['base_version'] <= version]
+        if not chains:
+            raise FileNotFoundError("没有可用的备份")
+        chain = chains[-1]
+
+        restored_version, records = _read_records(self.root / chain['dir'] / "base.jsonl.gz")
+        articles = {record['article']['link']: record['article'] for record in records}
+        for delta in chain['deltas']:
+            if version is not None and delta['version'] > version:
+                break
+            restored_version, records = _read_records(self.root / chain['dir'] / delta['file'])
+            for record in records:
+                if record['op'] == 'upsert':
+                    articles[record['article']['link']] = record['article']
+                else:
+                    articles.pop(record['link'], None)
+        return restored_version, list(articles.values())
+
+    def restore(self, version: Optional[int] = None) -> int:
+        """用备份整篇替换文章库的内容（一次提交），返回恢复的文章数"""
+        restored_version, articles = self.load(version)
+        restored_links = {article['link'] for article in articles}
+        stale = [article['link'] for article in self.store.iter_articles() if article['link'] not in restored_links]
+        self.store.commit(upserts=articles, deletes=stale)
+        logger.info(f"从备份版本 {restored_version} 恢复了 {len(articles)} 篇文章，删除了 {len(stale)} 篇")
+        return len(articles)
+
+
+_manager: Optional[BackupManager] = None
+
+
+def get_backup_manager() -> BackupManager:
+    """进程内共享的备份管理器"""
+    global _manager
+    if _manager is None:
+        _manager = BackupManager()
+    return _manager
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+正文内容寻址存储 - 文章正文按SHA-256保存为独立的gzip文件，文章只保存引用
+同一篇通讯社稿件被多个来源转载时正文只存一份；列表查询只读元数据，详情页只读一个文件
+"""
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from app.config import BLOB_DIR, BLOB_GC_GRACE_HOURS
+from app.storage import FileLock
+
+logger = logging.getLogger("blob_store")
+
+_SUFFIX = ".txt.gz"
+
+
+def content_hash(text: str) -> str:
+    """正文的内容地址"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class BlobStore:
+    """按哈希分目录保存的只写一次的正文文件，多个进程共享"""
+
+    def __init__(self, root: Path = BLOB_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # 复用已有正文（刷新修改时间）与回收时的检查和删除互斥
+        self._gc_lock = FileLock(self.root / "gc.lock")
+
+    def _path(self, ref: str) -> Path:
+        return self.root / ref[:2] / f"{ref[2:]}{_SUFFIX}"
+
+    def put(self, text: str) -> str:
+        """保存正文并返回引用；相同内容已存在时刷新其修改时间后返回"""
+        ref = content_hash(text)
+        path = self._path(ref)
+        with self._gc_lock:
+            try:
+                # 已存在的正文可能是尚未回收的孤儿，刷新修改时间使它重新进入宽限期，
+                # 否则回收可能删掉即将被新文章引用的文件
+                os.utime(path)
+                return ref
+            except FileNotFoundError:
+                pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(text.encode('utf-8')))
+                f.flush()
+                os.fsync(f.fileno())
+            # 内容相同的并发写入互相覆盖也没有影响
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        """读取正文，不存在时返回None"""
+        try:
+            with open(self._path(ref), 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8')
+        except FileNotFoundError:
+            logger.warning(f"正文 {ref} 不存在")
+            return None
+
+    def _iter_refs(self) -> Iterator[Path]:
+        return self.root.glob(f"*/*{_SUFFIX}")
+
+    def gc(self, live_refs: Iterable[str], grace_hours: float = BLOB_GC_GRACE_HOURS) -> int:
+        """
+        删除不再被任何文章引用的正文，返回删除的文件数
+        只删除超过 grace_hours 的文件，避免删掉并发写入方刚保存、尚未提交到文章库的正文
+        """
+        live: Set[str] = set(live_refs)
+        cutoff = time.time() - grace_hours * 3600
+        removed = 0
+        for path in self._iter_refs():
+            ref = path.parent.name + path.name[:-len(_SUFFIX)]
+            if ref in live:
+                continue
+            try:
+                with self._gc_lock:
+                    if path.stat().st_mtime > cutoff:
+                        continue
+                    path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+        if removed:
+            logger.info(f"删除了 {removed} 个不再被引用的正文")
+        return removed
+
+    def stats(self) -> Dict:
+        paths = list(self._iter_refs())
+        return {
+            'blobs': len(paths),
+            'bytes': sum(path.stat().st_size for path in paths)
+        }
+
+
+_blob_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """进程内共享的正文存储"""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore()
+    return _blob_store
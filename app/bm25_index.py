@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+BM25相关性索引 - 基于文章正文的增量倒排索引
+新文章只需 O(文档长度) 更新索引，持久化为只追加的JSONL日志
+查询配置中的多词短语（如 "central bank"）在索引时单独统计出现次数，按短语打分
+每篇文档记录内容指纹，标题、摘要或正文变化后重新索引
+"""
+import hashlib
+import json
+import logging
+import math
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import (
+    BM25_INDEX_PATH,
+    BM25_QUERY_PROFILE,
+    BM25_K1,
+    BM25_B,
+    BM25_SCORE_WEIGHT
+)
+from app.blob_store import content_hash
+from app.text_utils import tokenize, term_frequencies
+
+logger = logging.getLogger("bm25_index")
+
+
+def document_text(article: Dict) -> str:
+    """用于索引的文章文本：标题 + 正文（没有正文时使用摘要）"""
+    body = article.get('content') or article.get('summary') or ''
+    return f"{article.get('title', '')}\n{body}"
+
+
+def _phrase(raw_term: str) -> str:
+    """查询词项在索引中的键：单词即词项本身，多词短语为以空格连接的词项（词项本身不含空格）"""
+    return ' '.join(tokenize(raw_term))
+
+
+# 需要在索引时统计的短语（分词后的词项序列）
+PHRASES = tuple(sorted({tuple(tokenize(term)) for term in BM25_QUERY_PROFILE if len(tokenize(term)) > 1}))
+
+
+def index_terms(article: Dict) -> Dict[str, int]:
+    """文章的词频，另加 PHRASES 中各短语的出现次数"""
+    tokens = tokenize(document_text(article))
+    frequencies = term_frequencies(tokens)
+    for phrase in PHRASES:
+        count = sum(
+            1 for i, token in enumerate(tokens[:len(tokens) - len(phrase) + 1])
+            if token == phrase[0] and tuple(tokens[i:i + len(phrase)]) == phrase
+        )
+        if count:
+            frequencies[' '.join(phrase)] = count
+    return frequencies
+
+
+def content_fingerprint(article: Dict) -> str:
+    """
+    索引文本的指纹，不需要加载正文：正文用 content_ref（与内联正文的内容哈希相同）表示
+    包含短语列表，修改查询配置中的短语后全部文档会重新索引
+    """
+    content = article.get('content')
+    body = article.get('content_ref') or (content_hash(content) if content else None)
+    parts = [article.get('title'), article.get('summary'), body, PHRASES]
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+class BM25Index:
+    """增量维护的BM25倒排索引"""
+
+    def __init__(self, path: Path = BM25_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+
+        # 文档 -> (长度, 词频)，词项 -> {文档: 词频}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+
+        # 已读取的日志位置和行数，用于增量刷新与判断是否需要压缩
+        self._offset = 0
+        self._inode = None
+        self._log_records = 0
+        self._lock = threading.RLock()
+
+        # 每次内存中的索引变化时递增，缓存的打分结果据此判断是否过期
+        self.generation = 0
+
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, link: str) -> bool:
+        return link in self.doc_lengths
+
+    def _apply_add(self, link: str, frequencies: Dict[str, int], fingerprint: Optional[str] = None) -> None:
+        """在内存中加入一篇文档"""
+        self.generation += 1
+        if link in self.doc_lengths:
+            self._apply_remove(link)
+        # 短语是额外统计的，不计入文档长度
+        length = sum(tf for term, tf in frequencies.items() if ' ' not in term)
+        self.doc_lengths[link] = length
+        self.doc_terms[link] = frequencies
+        if fingerprint is not None:
+            self.fingerprints[link] = fingerprint
+        self.total_length += length
+        for term, tf in frequencies.items():
+            self.postings.setdefault(term, {})[link] = tf
+
+    def _apply_remove(self, link: str) -> None:
+        """在内存中移除一篇文档"""
+        self.generation += 1
+        frequencies = self.doc_terms.pop(link, None)
+        self.fingerprints.pop(link, None)
+        if frequencies is None:
+            return
+        self.total_length -= self.doc_lengths.pop(link)
+        for term in frequencies:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(link, None)
+                if not posting:
+                    del self.postings[term]
+
+    def _append_log(self, records: List[Dict]) -> None:
+        """把操作追加写入日志"""
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._offset = f.tell()
+        if self._inode is None:
+            self._inode = self.path.stat().st_ino
+        self._log_records += len(records)
+
+    def refresh(self) -> None:
+        """读取其他进程追加的日志记录（只读取新增部分）"""
+        with self._lock:
+            if not self.path.exists():
+                return
+            stat = self.path.stat()
+            size = stat.st_size
+            if stat.st_ino != self._inode or size < self._offset:
+                # 首次加载，或日志被压缩重写，重新加载
+                self._reset()
+                self._inode = stat.st_ino
+            if size == self._offset:
+                return
+
+            with open(self.path, 'r', encoding='utf-8') as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith('\n'):
+                        # 写入中途的行，等下次刷新再读
+                        break
+                    self._offset += len(line.encode('utf-8'))
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("跳过损坏的索引日志记录")
+                        continue
+                    self._log_records += 1
+                    if record.get('op') == 'add':
+                        self._apply_add(record['link'], record['tf'], record.get('fp'))
+                    elif record.get('op') == 'remove':
+                        self._apply_remove(record['link'])
+
+    def _reset(self) -> None:
+        self.generation += 1
+        self.doc_lengths.clear()
+        self.doc_terms.clear()
+        self.fingerprints.clear()
+        self.postings.clear()
+        self.total_length = 0
+        self._offset = 0
+        self._log_records = 0
+
+    def add_articles(self, articles: Iterable[Dict]) -> int:
+        """索引新文章（已存在的链接会被替换），返回索引的文章数"""
+        records = []
+        with self._lock:
+            self.refresh()
+            for article in articles:
+                link = article.get('link')
+                if not link:
+                    continue
+                frequencies = index_terms(article)
+                fingerprint = content_fingerprint(article)
+                self._apply_add(link, frequencies, fingerprint)
+                records.append({'op': 'add', 'link': link, 'tf': frequencies, 'fp': fingerprint})
+            self._append_log(records)
+            self._maybe_compact()
+        return len(records)
+
+    def remove_links(self, links: Iterable[str]) -> int:
+        """从索引中移除文章，返回移除的文章数"""
+        records = []
+        with self._lock:
+            self.refresh()
+            for link in links:
+                if link in self.doc_lengths:
+                    self._apply_remove(link)
+                    records.append({'op': 'remove', 'link': link})
+            self._append_log(records)
+            self._maybe_compact()
+        return len(records)
+
+    def is_current(self, article: Dict) -> bool:
+        """文章已按当前内容索引（只需元数据，不需要正文）"""
+        return self.fingerprints.get(article.get('link')) == content_fingerprint(article)
+
+    def missing_links(self, articles: Iterable[Dict]) -> List[str]:
+        """尚未索引或内容已变化的文章链接"""
+        return [article['link'] for article in articles if article.get('link') and not self.is_current(article)]
+
+    def add_missing(self, articles: Iterable[Dict]) -> int:
+        """只索引尚未索引或内容已变化的文章"""
+        missing = [article for article in articles if article.get('link') and not self.is_current(article)]
+        return self.add_articles(missing) if missing else 0
+
+    def sync(self, articles: List[Dict]) -> None:
+        """让索引与给定的文章集合一致：只处理新增、内容变化和已删除的文章"""
+        links = {article.get('link') for article in articles}
+        missing = [article for article in articles if article.get('link') and not self.is_current(article)]
+        stale = [link for link in self.doc_lengths if link not in links]
+        if missing:
+            self.add_articles(missing)
+        if stale:
+            self.remove_links(stale)
+
+    def _maybe_compact(self) -> None:
+        """日志中失效记录过多时，重写为只包含当前文档的快照"""
+        if self._log_records <= 2 * len(self.doc_lengths) + 100:
+            return
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for link, frequencies in self.doc_terms.items():
+                record = {'op': 'add', 'link': link, 'tf': frequencies, 'fp': self.fingerprints.get(link)}
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            offset = f.tell()
+        tmp_path.replace(self.path)
+        self._inode = self.path.stat().st_ino
+        self._offset = offset
+        self._log_records = len(self.doc_terms)
+        logger.info(f"BM25索引日志已压缩，当前 {len(self.doc_terms)} 篇文档")
+
+    def score(self, query: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """按查询配置计算所有命中文档的BM25分数"""
+        query = BM25_QUERY_PROFILE if query is None else query
+        with self._lock:
+            num_docs = len(self.doc_lengths)
+            if not num_docs:
+                return {}
+            avg_length = self.total_length / num_docs or 1.0
+
+            scores: Dict[str, float] = {}
+            for raw_term, weight in query.items():
+                # 多词短语作为一个词项打分（只有 PHRASES 中的短语有倒排列表）
+                posting = self.postings.get(_phrase(raw_term))
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                for link, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[link] / avg_length)
+                    scores[link] = scores.get(link, 0.0) + weight * idf * tf * (self.k1 + 1) / (tf + norm)
+            return scores
+
+    def combined_scores(self, articles: List[Dict],
+                        query: Optional[Dict[str, float]] = None,
+                        weight: float = BM25_SCORE_WEIGHT) -> List[Tuple[float, float]]:
+        """返回每篇文章的 (综合分数, BM25分数)：关键词分数 + 归一化后的BM25分数"""
+        bm25 = self.score(query)
+        top = max(bm25.values()) if bm25 else 0.0
+        results = []
+        for article in articles:
+            raw = bm25.get(article.get('link'), 0.0)
+            normalized = raw / top if top else 0.0
+            results.append((article.get('score', 0) + weight * normalized, raw))
+        return results
+
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> BM25Index:
+    """获取进程内共享的索引实例（惰性加载，之后只增量刷新）"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BM25Index()
+        else:
+            _index.refresh()
+        return _index
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+跨来源报道聚类 - 把不同来源对同一事件的报道归入同一个故事簇
+每篇新文章通过MinHash LSH查找候选簇，均摊 O(1) 完成归类
+爬虫和聚合器都会写簇文件：保存时加锁重新读取，只合并本实例改动过的簇，再整体原子替换
+"""
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.config import (
+    CLUSTERS_PATH,
+    CLUSTER_THRESHOLD,
+    CLUSTER_NUM_PERM,
+    CLUSTER_BANDS,
+    CLUSTER_BODY_CHARS,
+    CLUSTER_WINDOW_HOURS
+)
+from app.dedup import NearDuplicateDetector
+from app.storage import FileLock, atomic_write
+from app.url_canonical import article_id
+
+logger = logging.getLogger("clustering")
+
+
+def has_body(article: Dict) -> bool:
+    """文章是否已有正文（正文在内容寻址存储中时看 content_length）"""
+    return max(len(article.get('content') or ''), article.get('content_length') or 0) > 200
+
+
+def _members(clusters: Dict[str, Dict]) -> Set[str]:
+    return {link for cluster in clusters.values() for link in cluster.get('members', [])}
+
+
+def _merge_cluster(theirs: Dict, ours: Dict) -> Dict:
+    """合并两个写入方对同一个簇的改动：成员取并集，代表文章取分数较高的一方"""
+    merged = {**theirs}
+    merged['members'] = list(dict.fromkeys(theirs.get('members', []) + ours.get('members', [])))
+    merged['has_body'] = theirs.get('has_body', False) or ours.get('has_body', False)
+    merged['created_at'] = min(theirs.get('created_at', 0), ours.get('created_at', 0))
+    merged['updated_at'] = max(theirs.get('updated_at', 0), ours.get('updated_at', 0))
+    if (ours.get('representative_score') or 0) >= (theirs.get('representative_score') or 0):
+        for key in ('representative', 'representative_score', 'title'):
+            merged[key] = ours.get(key)
+    return merged
+
+
+class StoryClusterer:
+    """增量故事聚类器，簇信息持久化在 CLUSTERS_PATH"""
+
+    def __init__(self, path: Path = CLUSTERS_PATH,
+                 threshold: float = CLUSTER_THRESHOLD,
+                 window_hours: float = CLUSTER_WINDOW_HOURS):
+        self.path = Path(path)
+        self.window = window_hours * 3600
+        # 单词级shingle + 标题和正文开头，比去重宽松，能把改写过的同一事件报道归到一起
+        self.detector = NearDuplicateDetector(
+            threshold=threshold,
+            num_perm=CLUSTER_NUM_PERM,
+            bands=CLUSTER_BANDS,
+            shingle_size=1,
+            body_chars=CLUSTER_BODY_CHARS
+        )
+        self._lock = FileLock(self.path.with_suffix('.lock'))
+        self.clusters: Dict[str, Dict] = self._load()
+        # 本实例改动过的簇，以及本实例见过的成员链接（保存时只清理这些链接）
+        self._dirty: Set[str] = set()
+        self._known: Set[str] = _members(self.clusters)
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self, valid_links: Optional[Set[str]] = None) -> None:
+        """
+        保存簇信息；传入 valid_links 时去掉已不在库中的成员和空簇
+        加锁后重新读取文件，把本实例改动过的簇合并进去，其他写入方的改动不会丢失；
+        只清理本实例见过的链接，其他写入方在此期间加入的成员保留
+        """
+        with self._lock:
+            clusters = self._load()
+            for cluster_id in self._dirty:
+                ours = self.clusters.get(cluster_id)
+                if ours is None:
+                    continue
+                theirs = clusters.get(cluster_id)
+                clusters[cluster_id] = ours if theirs is None else _merge_cluster(theirs, ours)
+
+            if valid_links is not None:
+                for cluster_id in list(clusters):
+                    cluster = clusters[cluster_id]
+                    cluster['members'] = [
+                        link for link in cluster['members']
+                        if link in valid_links or link not in self._known
+                    ]
+                    if not cluster['members']:
+                        del clusters[cluster_id]
+                    elif cluster['representative'] not in cluster['members']:
+                        cluster['representative'] = cluster['members'][0]
+                        cluster['representative_score'] = None
+
+            atomic_write(self.path, json.dumps(clusters, ensure_ascii=False, indent=2))
+            self.clusters = clusters
+            self._dirty.clear()
+            self._known = _members(clusters)
+
+    def is_active(self, cluster: Dict) -> bool:
+        """簇在时间窗口内有更新才接收新成员"""
+        return time.time() - cluster.get('updated_at', 0) <= self.window
+
+    def index_articles(self, articles: Iterable[Dict]) -> None:
+        """把库中仍处于活跃簇的文章加入LSH，供新文章匹配"""
+        for article in articles:
+            cluster = self.clusters.get(article.get('cluster_id'))
+            if cluster and self.is_active(cluster):
+                self.detector.add(article)
+
+    def active_links(self) -> Set[str]:
+        """活跃簇的成员链接"""
+        return {link for cluster in self.clusters.values() if self.is_active(cluster) for link in cluster['members']}
+
+    def index_store(self, store) -> int:
+        """只从文章库读取活跃簇的成员（带正文）加入LSH，与库的大小无关，返回读取的文章数"""
+        links = self.active_links()
+        articles = store.get_many(links, with_content=True) if links else []
+        self.index_articles(articles)
+        return len(articles)
+
+    def assign(self, article: Dict) -> str:
+        """为文章分配簇（已分配的保持不变），返回簇ID"""
+        cluster_id = article.get('cluster_id')
+        if cluster_id in self.clusters:
+            return cluster_id
+
+        now = time.time()
+        match = self.detector.find_duplicate(article)
+        cluster = self.clusters.get(match.get('cluster_id')) if match else None
+
+        if cluster is None or not self.is_active(cluster):
+            cluster_id = article_id(article.get('link', ''))
+            cluster = {
+                'title': article.get('title', ''),
+                'representative': article.get('link'),
+                'representative_score': article.get('score', 0),
+                'members': [],
+                'has_body': False,
+                'created_at': now,
+                'updated_at': now
+            }
+            self.clusters[cluster_id] = cluster
+        else:
+            cluster_id = match['cluster_id']
+
+        if article.get('link') not in cluster['members']:
+            cluster['members'].append(article.get('link'))
+        self._dirty.add(cluster_id)
+        self._known.add(article.get('link'))
+        cluster['updated_at'] = now
+        cluster['has_body'] = cluster.get('has_body', False) or has_body(article)
+
+        # 代表文章取分数最高的成员
+        best = cluster.get('representative_score')
+        if best is None or article.get('score', 0) > best:
+            cluster['representative'] = article.get('link')
+            cluster['representative_score'] = article.get('score', 0)
+            cluster['title'] = article.get('title', '')
+
+        article['cluster_id'] = cluster_id
+        self.detector.add(article)
+        return cluster_id
+
+    def assign_many(self, articles: List[Dict]) -> None:
+        """按分数从高到低分配，使每个新簇以最相关的文章为代表"""
+        for article in sorted(articles, key=lambda x: x.get('score', 0), reverse=True):
+            self.assign(article)
+
+    def mark_body(self, cluster_id: Optional[str]) -> None:
+        """记录该簇已有成员抓取到正文"""
+        if cluster_id in self.clusters:
+            self.clusters[cluster_id]['has_body'] = True
+            self._dirty.add(cluster_id)
+
+    def covered_clusters(self) -> Set[str]:
+        """已有正文的簇，其他成员不必再抓取正文"""
+        return {cluster_id for cluster_id, cluster in self.clusters.items() if cluster.get('has_body')}
+
@@ -105,6 +105,82 @@ GOLD_KEYWORDS = [
     "central bank", "inflation", "safe haven", "store of value"
 ]
 
+# 相关性评分关键词表（与 GOLD_KEYWORDS 一起编译进同一个多模式匹配器）
+# 核心关键词 - 任何一个命中即视为黄金相关
+CORE_KEYWORDS = ["gold", "silver", "precious metal", "bullion", "xau"]
+
+# 次要关键词 - 至少命中两个才视为黄金相关
+SECONDARY_KEYWORDS = [
+    "price", "market", "invest", "troy ounce", "etf",
+    "trading", "inflation", "central bank", "fed", "safe haven"
+]
+
+# 价格走势关键词 - 标题中每命中一个加分
+PRICE_KEYWORDS = [
+    "price", "rally", "surge", "plunge", "drop", "rise",
+    "soar", "jump", "fall", "crash", "record", "high", "low"
+]
+
+# 聚合器使用的关键词权重（标题 + 描述）
+KEYWORD_WEIGHTS = {
+    "gold": 10, "bullion": 8, "precious metals": 8,
+    "xau": 7, "gold price": 12, "gold market": 10,
+    "central bank": 6, "inflation": 5, "safe haven": 8,
+    "silver": 6, "platinum": 5, "palladium": 5
+}
+
+# 正文抓取预算 - 按分数从高到低抓取正文，低分文章只保留标题和摘要
+MAX_ARTICLES_PER_SOURCE = 10   # 每个列表页最多保留的候选文章数
+FETCH_BUDGET_TOTAL = 30        # 每次运行最多抓取的正文数，None 表示不限制
+FETCH_BUDGET_PER_SOURCE = 5    # 每个来源每次运行最多抓取的正文数，None 表示不限制
+FETCH_MIN_SCORE = 6.0          # 低于该分数的文章不抓取正文
+
+# BM25正文相关性 - 查询配置中的词项会与正文分词结果对齐（小写、去停用词）
+BM25_QUERY_PROFILE = {
+    "gold": 1.0, "bullion": 1.0, "xau": 1.0, "precious": 0.8,
+    "ounce": 0.6, "spot": 0.5, "futures": 0.5, "etf": 0.5,
+    "silver": 0.5, "central bank": 0.5, "inflation": 0.5, "haven": 0.5,
+    "fed": 0.4, "yields": 0.3, "dollar": 0.3
+}
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_SCORE_WEIGHT = 10.0  # 归一化BM25分数(0~1)在综合分数中的权重
+
+# 近似重复检测（MinHash LSH）- 估计Jaccard相似度达到阈值即视为同一篇稿件
+NEAR_DUP_THRESHOLD = 0.5      # 相似度阈值，越低越容易判为重复
+NEAR_DUP_NUM_PERM = 64        # MinHash签名长度
+NEAR_DUP_BANDS = 16           # LSH分段数（每段 NUM_PERM / BANDS 行），约在 (1/BANDS)^(BANDS/NUM_PERM) 处开始召回
+NEAR_DUP_SHINGLE_SIZE = 2     # 词级shingle长度
+NEAR_DUP_BODY_CHARS = 2000    # 参与指纹计算的正文长度
+
+# URL规范化 - 入库时从链接中去除的跟踪参数（参数名小写）
+# 全局只列广告/营销平台的专用参数；ref、cid、mod 这类通用名在某些站点是文章身份的一部分，只按域名去除
+URL_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "igshid",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok",
+    "pk_campaign", "pk_kwd", "pk_source", "pk_medium", "pk_content"
+}
+URL_TRACKING_PREFIXES = ("utm_", "mtm_")
+# 域名 -> 该站点（含子域名）额外的跟踪参数
+URL_TRACKING_PARAMS_BY_DOMAIN = {
+    "yahoo.com": {"guccounter", "guce_referrer", "guce_referrer_sig", ".tsrc", "soc_src", "soc_trk", "ncid"},
+    "cnbc.com": {"__source", "taid"},
+    "reuters.com": {"taid"},
+    "bloomberg.com": {"cmpid", "srnd", "sref"},
+    "ft.com": {"ftcamp", "segmentid"},
+    "msn.com": {"ocid", "cvid"},
+    "wsj.com": {"mod"},
+    "nytimes.com": {"smid", "smtyp"},
+    "twitter.com": {"ref_src"},
+}
+
+# 跨来源故事聚类 - 比近似去重宽松，把同一事件的不同报道归为一簇
+CLUSTER_THRESHOLD = 0.3       # 估计Jaccard相似度阈值（单词级shingle）
+CLUSTER_NUM_PERM = 64
+CLUSTER_BANDS = 32            # 每段2行，低相似度也能进入候选
+CLUSTER_BODY_CHARS = 500      # 参与聚类的正文长度
+CLUSTER_WINDOW_HOURS = 48     # 簇超过该时间没有新成员后不再接收新文章
+
 SCRAPE_INTERVAL = 60  # minutes - 增加抓取间隔以防止封禁
 
 # Ollama settings
@@ -128,9 +204,88 @@ Risk Alert:
 """
 
 # Storage settings
-STORAGE_TYPE = "json"  # "json" or "sqlite"
+# "json"（默认）、"jsonl" 或 "sqlite"；jsonl/SQLite 首次使用时自动从 JSON_DB_PATH 迁移，
+# 迁移后不再写入 JSON_DB_PATH，切回 "json" 前须先导出（见 DEPLOYMENT.md）
+STORAGE_TYPE = "json"
 JSON_DB_PATH = BASE_DIR / "data" / "news_db.json"
 SQLITE_DB_PATH = BASE_DIR / "data" / "news_db.sqlite"
+# 只追加的文章日志及其压缩快照
+ARTICLE_LOG_PATH = BASE_DIR / "data" / "news_log.jsonl"
+ARTICLE_SNAPSHOT_PATH = BASE_DIR / "data" / "news_snapshot.jsonl"
+ARTICLE_LOG_COMPACT_RECORDS = 1000  # 日志记录数超过该值且超过库中文章数时，后台压缩为快照
+BM25_INDEX_PATH = BASE_DIR / "data" / "bm25_index.jsonl"
+CLUSTERS_PATH = BASE_DIR / "data" / "clusters.json"
+
+# 文章正文按内容哈希单独保存，文章库中只保存 content_ref 引用
+BLOB_DIR = BASE_DIR / "data" / "blobs"
+BLOB_GC_GRACE_HOURS = 24        # 不再被引用的正文保留该时长后才删除
+
+# Web服务的进程内文章缓存：最多每隔该秒数检查一次库版本号，版本变化时重新加载
+ARTICLE_CACHE_CHECK_SECONDS = 1.0
+
+# HTTP缓存：浏览器每次用ETag重新验证（304），nginx等共享缓存在该秒数内直接使用缓存
+HTTP_SHARED_MAX_AGE = 5
+HTTP_STALE_WHILE_REVALIDATE = 30  # 过期后重新验证期间仍可返回旧响应的秒数
+# 响应缓存：响应体和gzip / brotli（需要安装 brotli）压缩版本按ETag缓存，每个版本只压缩一次
+HTTP_RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+HTTP_COMPRESS_MIN_BYTES = 1024    # 小于该大小的响应不压缩
+HTTP_GZIP_LEVEL = 9               # 只压缩一次，可以用最高压缩级别
+HTTP_BROTLI_QUALITY = 9
+
+# 全文检索（SQLite FTS5，所有存储后端共用）
+SEARCH_DB_PATH = BASE_DIR / "data" / "search.sqlite"
+SEARCH_TITLE_WEIGHT = 5.0       # 标题命中相对正文的BM25权重
+SEARCH_SNIPPET_TOKENS = 24      # 结果片段的词数
+
+# 文章保留策略（设为 None 表示不限制）
+RETENTION_MAX_AGE_DAYS = 14     # 按抓取时间，超过该天数的文章被删除
+RETENTION_MAX_ARTICLES = 100    # 最多保留的文章数，超出时删除抓取时间最早的
+RETENTION_MAX_PER_SOURCE = None # 每个来源最多保留的文章数
+RETENTION_INTERVAL_MINUTES = 60 # 调度器运行保留策略的间隔
+
+# 按顺序评估，命中任一策略的文章被删除：
+#   max_age / max_count / max_per_source 由调度器定期运行，只查询即将过期的文章
+#   content 为内容质量规则，在文章写入或修改时检查；field 字段匹配 pattern 正则，
+#   或包含 contains_all 中的全部字符串
+RETENTION_POLICIES = [
+    {"type": "max_age", "days": RETENTION_MAX_AGE_DAYS},
+    {"type": "max_count", "count": RETENTION_MAX_ARTICLES},
+    {"type": "max_per_source", "count": RETENTION_MAX_PER_SOURCE},
+    {"type": "content", "name": "2022年的旧文章", "field": "pub_date", "pattern": r"2022"},
+    {"type": "content", "name": "2022年/FOMC会议页面", "field": "title", "pattern": r"2022|FOMC Meetings"},
+    {
+        "type": "content",
+        "name": "美联储网站导航文本",
+        "field": "content",
+        "contains_all": ["Federal Reserve, the central bank", "Board of Governors"]
+    },
+]
+
+# 归档：时间和数量策略删除的文章写入按抓取日期分区的压缩分段，用于回测
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = BASE_DIR / "data" / "archive"
+ARCHIVE_COMPRESSION = "gzip"    # gzip 或 zstd（需要安装 zstandard）
+
+# 增量备份：基础快照 + 只包含变化文章的增量
+BACKUP_DIR = BASE_DIR / "data" / "backups"
+BACKUP_DELTAS_PER_BASE = 24     # 每条备份链的增量数，达到后写新的基础快照
+BACKUP_KEEP_CHAINS = 3          # 保留最近的备份链数
+BACKUP_INTERVAL_MINUTES = 60    # 调度器运行增量备份的间隔
+
+# Parquet导出（需要安装 pyarrow），按抓取日期分区，供分析使用
+EXPORT_DIR = BASE_DIR / "data" / "export"
+EXPORT_INCLUDE_BODY = False     # 是否导出正文列
+EXPORT_COMPRESSION = "zstd"     # Parquet列压缩算法
+
+# 静态发布：每次聚合和保留策略运行后把首页和文章页预渲染到磁盘，由nginx直接提供（try_files）
+PUBLISH_ENABLED = False
+PUBLISH_DIR = BASE_DIR / "data" / "public"
+
+# 新文章推送（/events，Server-Sent Events）
+EVENTS_QUEUE_SIZE = 100         # 每个客户端最多积压的消息数，超过后丢弃积压并发送 reset
+EVENTS_HEARTBEAT_SECONDS = 15   # 没有消息时发送心跳的间隔
+EVENTS_POLL_SECONDS = 2.0       # 检查文章库版本号（其他进程的写入）的间隔
+EVENTS_REPLAY = 20              # 保留最近的消息数，断线重连时按 Last-Event-ID 补发
 
 # Ensure data directory exists
 os.makedirs(BASE_DIR / "data", exist_ok=True)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+近似重复检测 - 基于MinHash + LSH分桶
+同一篇通讯社稿件被不同网站转载、标题略有改动时，也能识别为重复
+"""
+import logging
+import random
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from app.config import (
+    NEAR_DUP_THRESHOLD,
+    NEAR_DUP_NUM_PERM,
+    NEAR_DUP_BANDS,
+    NEAR_DUP_SHINGLE_SIZE,
+    NEAR_DUP_BODY_CHARS
+)
+from app.text_utils import tokenize
+
+logger = logging.getLogger("dedup")
+
+# 梅森素数 2^31-1，保证 a*x+b 在int64内不溢出
+_PRIME = (1 << 31) - 1
+_SEED = 20250607
+
+
+def article_shingles(article: Dict, size: int = NEAR_DUP_SHINGLE_SIZE,
+                     body_chars: int = NEAR_DUP_BODY_CHARS) -> Set[int]:
+    """标题 + 正文开头的词级shingle，哈希为稳定的32位整数"""
+    body = article.get('content') or article.get('summary') or ''
+    tokens = tokenize(f"{article.get('title', '')} {body[:body_chars]}")
+    if len(tokens) < size:
+        return {zlib.crc32(' '.join(tokens).encode('utf-8'))} if tokens else set()
+    return {
+        zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8'))
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+class NearDuplicateDetector:
+    """MinHash LSH近似重复检测器，单篇文章的插入和查询均为常数个桶操作"""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD,
+                 num_perm: int = NEAR_DUP_NUM_PERM,
+                 bands: int = NEAR_DUP_BANDS,
+                 shingle_size: int = NEAR_DUP_SHINGLE_SIZE,
+                 body_chars: int = NEAR_DUP_BODY_CHARS):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.body_chars = body_chars
+
+        rng = random.Random(_SEED)
+        self._a = np.asarray([rng.randrange(1, _PRIME) for _ in range(num_perm)], dtype=np.int64)
+        self._b = np.asarray([rng.randrange(0, _PRIME) for _ in range(num_perm)], dtype=np.int64)
+
+        # 每个band一个哈希桶表：band值 -> 文章编号列表
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+        self._articles: List[Dict] = []
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+    def signature(self, article: Dict) -> Optional[np.ndarray]:
+        """计算文章的MinHash签名；没有可用文本时返回None"""
+        shingles = article_shingles(article, self.shingle_size, self.body_chars)
+        if not shingles:
+            return None
+        values = np.fromiter(shingles, dtype=np.int64, count=len(shingles)) % _PRIME
+        hashed = (self._a[:, None] * values[None, :] + self._b[:, None]) % _PRIME
+        return hashed.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _find(self, signature: np.ndarray, keys: List[bytes]) -> Optional[Dict]:
+        """在候选桶中找到估计相似度最高且超过阈值的文章"""
+        candidates: Set[int] = set()
+        for band, key in enumerate(keys):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return self._articles[best] if best is not None else None
+
+    def _insert(self, article: Dict, signature: np.ndarray, keys: List[bytes]) -> None:
+        position = len(self._articles)
+        self._articles.append(article)
+        self._signatures.append(signature)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(position)
+
+    def add(self, article: Dict) -> None:
+        """把文章加入索引（不检查重复）"""
+        signature = self.signature(article)
+        if signature is not None:
+            self._insert(article, signature, self._band_keys(signature))
+
+    def add_many(self, articles: Iterable[Dict]) -> None:
+        for article in articles:
+            self.add(article)
+
+    def find_duplicate(self, article: Dict) -> Optional[Dict]:
+        """返回已索引文章中与之近似重复的一篇，没有则返回None"""
+        signature = self.signature(article)
+        if signature is None:
+            return None
+        return self._find(signature, self._band_keys(signature))
+
+    def check_and_add(self, article: Dict) -> Optional[Dict]:
+        """检查是否与已索引文章重复；不重复时加入索引并返回None"""
+        signature = self.signature(article)
+        if signature is None:
+            return None
+        keys = self._band_keys(signature)
+        duplicate = self._find(signature, keys)
+        if duplicate is None:
+            self._insert(article, signature, keys)
+        return duplicate
+
+
+def filter_near_duplicates(articles: List[Dict], history: Iterable[Dict] = (),
+                           detector: Optional[NearDuplicateDetector] = None) -> List[Dict]:
+    """去掉与历史文章或本批次中更早文章近似重复的文章"""
+    detector = detector or NearDuplicateDetector()
+    detector.add_many(history)
+
+    unique = []
+    for article in articles:
+        duplicate = detector.check_and_add(article)
+        if duplicate is not None:
+            logger.info(f"跳过近似重复文章: {article.get('title')} ({article.get('source')}) "
+                        f"≈ {duplicate.get('title')} ({duplicate.get('source')})")
+            continue
+        unique.append(article)
+    return unique
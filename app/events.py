@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+新文章推送（Server-Sent Events）- 文章库提交新文章后立即推送给所有订阅的浏览器
+每个异步工作进程有一个后台任务监视文章库版本号（任何进程的提交都能发现），
+本进程内的写入可以通过 notify() 立即唤醒它；新文章只计算一次，再放入每个客户端的有界队列
+每个连接只是一个队列和一个协程，单个异步工作进程可以保持数千个空闲连接
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from app.article_cache import get_article_cache
+from app.config import (
+    EVENTS_QUEUE_SIZE, EVENTS_HEARTBEAT_SECONDS, EVENTS_POLL_SECONDS, EVENTS_REPLAY
+)
+
+logger = logging.getLogger("events")
+
+# 推送给客户端的文章字段（不含正文）
+EVENT_FIELDS = ('id', 'title', 'link', 'source', 'pub_date', 'fetched_at', 'summary', 'score', 'cluster_id')
+
+
+def format_event(event: str, data, event_id: Optional[int] = None) -> str:
+    """一条SSE消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class EventBroker:
+    """把新文章分发给所有订阅者"""
+
+    def __init__(self, cache=None, queue_size: int = EVENTS_QUEUE_SIZE,
+                 heartbeat: float = EVENTS_HEARTBEAT_SECONDS, poll_interval: float = EVENTS_POLL_SECONDS,
+                 replay: int = EVENTS_REPLAY):
+        self.cache = cache if cache is not None else get_article_cache()
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self._clients: Set[asyncio.Queue] = set()
+        # 最近的 (版本号, 消息)，用于断线重连时按 Last-Event-ID 补发
+        self._recent: Deque[Tuple[int, str]] = deque(maxlen=replay)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def _start(self) -> None:
+        """在当前事件循环中启动监视任务（第一个订阅者到来时）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._watch())
+
+    def notify(self) -> None:
+        """文章库刚写入后调用，立即检查新文章；可以在任何线程中调用"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _watch(self) -> None:
+        snapshot = await asyncio.to_thread(self.cache.snapshot)
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                # notify()：本进程刚写入，不等缓存的检查间隔
+                self.cache.invalidate()
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                current = await asyncio.to_thread(self.cache.snapshot)
+            except Exception as e:
+                logger.error(f"检查新文章失败: {e}")
+                continue
+            if current.version == snapshot.version:
+                continue
+            new = [article for article in current.articles if article['link'] not in snapshot.index]
+            snapshot = current
+            if new:
+                self._broadcast(current.version, [{name: article.get(name) for name in EVENT_FIELDS} for article in new])
+
+    def _broadcast(self, version: int, articles: List[Dict]) -> None:
+        message = format_event("articles", articles, event_id=version)
+        self._recent.append((version, message))
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # 客户端读得太慢：丢弃积压的消息，让它重新加载列表
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(format_event("reset", {"version": version}, event_id=version))
+        logger.info(f"推送 {len(articles)} 篇新文章（版本 {version}）给 {len(self._clients)} 个客户端")
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """一个客户端的SSE消息流；连接断开时生成器被关闭并退订"""
+        self._start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._clients.add(queue)
+        try:
+            # 告诉浏览器断线后多久重连（毫秒）
+            yield f"retry: {int(self.heartbeat * 1000)}\n\n"
+            if last_event_id and last_event_id.isdigit():
+                for version, message in list(self._recent):
+                    if version > int(last_event_id):
+                        yield message
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    # 注释行作为心跳，保持连接和代理不超时
+                    yield ": keepalive\n\n"
+        finally:
+            self._clients.discard(queue)
+
+
+_broker: Optional[EventBroker] = None
+
+
+def get_broker() -> EventBroker:
+    """进程内共享的推送分发器"""
+    global _broker
+    if _broker is None:
+        _broker = EventBroker()
+    return _broker
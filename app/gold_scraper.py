@@ -1,10 +1,8 @@
 import time
-import json
 import logging
 import urllib.parse
 import re
 from datetime import datetime, timedelta
-from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
 import requests
@@ -23,7 +21,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from webdriver_manager.chrome import ChromeDriverManager
 
-from app.config import USER_AGENTS, JSON_DB_PATH
+from app.config import USER_AGENTS
+from app.keyword_matcher import KeywordMatcher
+from app.url_canonical import LinkIndex, canonicalize_url, dedupe_by_link
+from app.article_store import get_store
 
 # Configure logging
 logging.basicConfig(
@@ -107,6 +108,7 @@ class GoldScraper:
         }
         
         self.keywords = ["gold", "federal reserve", "wall street", "precious metals", "commodities", "bullion", "XAU", "silver", "platinum"]
+        self.keyword_matcher = KeywordMatcher(self.keywords)
         self.headers = {
             "User-Agent": USER_AGENTS[0],
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -118,8 +120,7 @@ class GoldScraper:
             "TE": "Trailers",
             "DNT": "1"
         }
-        self.db_path = JSON_DB_PATH
-        Path(self.db_path).parent.mkdir(exist_ok=True)
+        self.store = get_store()
         
         # Maximum age for articles (in days)
         self.max_article_age = 30  # Only fetch articles from last 30 days
@@ -225,7 +226,7 @@ class GoldScraper:
                         title = title_element.text.strip()
                         
                         # Filter by keywords
-                        if not any(keyword.lower() in title.lower() for keyword in self.keywords):
+                        if not self.keyword_matcher.contains_any(title):
                             continue
                             
                         rel_link = title_element.get("href")
@@ -420,7 +421,7 @@ class GoldScraper:
                                 title = link_elem.text.strip()
                                 
                                 # Only include if matches keywords and is recent
-                                if (any(keyword.lower() in title.lower() for keyword in self.keywords) and 
+                                if (self.keyword_matcher.contains_any(title) and 
                                     self.is_recent_article(pub_date)):
                                     
                                     rel_link = link_elem.get("href")
@@ -464,7 +465,7 @@ class GoldScraper:
                         
                         for link in links:
                             title = link.text.strip()
-                            if any(keyword.lower() in title.lower() for keyword in self.keywords):
+                            if self.keyword_matcher.contains_any(title):
                                 rel_link = link.get("href")
                                 if not rel_link:
                                     continue
@@ -592,37 +593,32 @@ class GoldScraper:
             return None
 
     def update_database(self, articles: List[Dict]):
-        existing_articles = []
+        version, loaded_articles = self.store.load_versioned()
         
-        if Path(self.db_path).exists():
-            try:
-                with open(self.db_path, "r") as f:
-                    existing_articles = json.load(f)
-            except json.JSONDecodeError:
-                logger.error("Error reading database file, starting with empty database")
-                existing_articles = []
-        
-        # 清理现有文章，移除2022年的内容
-        existing_articles = [
-            article for article in existing_articles 
-            if "2022" not in article.get("pub_date", "") and 
-               not re.search(r'2022|FOMC Meetings', article.get("title", ""))
-        ]
-        
-        existing_urls = {article["link"] for article in existing_articles}
-        new_articles = [article for article in articles if article["link"] not in existing_urls]
-        
-        updated_articles = new_articles + existing_articles
+        # Dedupe on canonical URLs (tracking params, AMP variants, www/mobile hosts)
+        for article in articles:
+            article["link"] = canonicalize_url(article["link"])
+        link_index = LinkIndex()
+        existing_articles = dedupe_by_link(loaded_articles, link_index)
+        new_articles = dedupe_by_link(articles, link_index)
         
-        # 确保最新的文章排在前面（按抓取时间排序）
-        updated_articles.sort(key=lambda x: x.get("fetched_at", ""), reverse=True)
+        # Only write the new articles and the duplicate rows that were cleaned up
+        kept_links = {article["link"] for article in existing_articles}
+        removed_links = [article["link"] for article in loaded_articles if article["link"] not in kept_links]
         
         try:
-            with open(self.db_path, "w") as f:
-                json.dump(updated_articles, f, indent=2)
+            self.store.commit(upserts=new_articles, deletes=removed_links, expected_version=version)
             logger.info(f"Added {len(new_articles)} new articles to database")
         except Exception as e:
             logger.error(f"Error updating database: {e}")
+            return
+        
+        # Old 2022 content and Fed boilerplate are dropped by the content rules on commit;
+        # age and count limits come from the shared retention policies
+        try:
+            self.store.apply_retention()
+        except Exception as e:
+            logger.error(f"Error applying retention policies: {e}")
     
     def scrape(self, fetch_content: bool = False) -> List[Dict]:
         articles = self.get_article_list()
@@ -666,15 +662,13 @@ class GoldScraper:
         logger.info("Extracting missing content for articles in the database")
         
         try:
-            # Load existing database
-            if not Path(self.db_path).exists():
-                logger.error(f"Database file {self.db_path} does not exist")
+            # Load existing database, bodies included
+            articles = self.store.load_all(with_content=True)
+            if not articles:
+                logger.error("Database is empty")
                 return
                 
-            with open(self.db_path, "r") as f:
-                articles = json.load(f)
-                
-            articles_updated = 0
+            updated_articles = []
             for article in articles:
                 # Skip if content is already populated or is a PDF
                 if article.get("content") and article.get("content") != "" and article.get("content") != "PDF report":
@@ -683,20 +677,21 @@ class GoldScraper:
                 # Skip PDF reports
                 if article.get("link", "").endswith(".pdf"):
                     article["content"] = "PDF document - content not extracted"
-                    articles_updated += 1
+                    updated_articles.append(article)
                     continue
                     
                 logger.info(f"Fetching missing content for article: {article['title']}")
                 content = self.get_article_content(article)
                 if content:
                     article["content"] = content
-                    articles_updated += 1
+                    updated_articles.append(article)
                     
-            # Save updated database
-            with open(self.db_path, "w") as f:
-                json.dump(articles, f, indent=2)
+            # Save only the content field, so concurrent writers are not overwritten
+            self.store.update_fields(
+                {"link": article["link"], "content": article["content"]} for article in updated_articles
+            )
                 
-            logger.info(f"Updated content for {articles_updated} articles in the database")
+            logger.info(f"Updated content for {len(updated_articles)} articles in the database")
             
         except Exception as e:
             logger.error(f"Error extracting missing content: {e}")
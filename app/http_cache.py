@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+HTTP条件请求 - 根据文章库版本生成ETag / Last-Modified，并判断请求能否直接回复304
+Cache-Control 让浏览器每次都带验证器重新验证，让nginx在 HTTP_SHARED_MAX_AGE 秒内直接使用缓存
+响应缓存：同一ETag的响应体及其gzip / brotli压缩版本只生成一次，之后的请求只是一次内存查找
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from app.config import (
+    HTTP_SHARED_MAX_AGE, HTTP_STALE_WHILE_REVALIDATE,
+    HTTP_RESPONSE_CACHE_BYTES, HTTP_COMPRESS_MIN_BYTES, HTTP_GZIP_LEVEL, HTTP_BROTLI_QUALITY
+)
+
+# 压缩版本的ETag后缀：不同编码的响应体不同，强ETag也必须不同
+_ENCODING_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+CACHE_CONTROL = (
+    f"public, max-age=0, s-maxage={HTTP_SHARED_MAX_AGE}, "
+    f"stale-while-revalidate={HTTP_STALE_WHILE_REVALIDATE}"
+)
+
+
+def make_etag(*parts: Any) -> str:
+    """由响应所依赖的全部状态（库版本、参数、结果中的链接等）生成强ETag"""
+    digest = hashlib.sha1(json.dumps(parts, default=str, ensure_ascii=False).encode('utf-8')).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def cache_headers(etag: str, last_modified: float) -> Dict[str, str]:
+    """响应的验证器和缓存策略头"""
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(int(last_modified), usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+
+def matching_etag(header: Optional[str], etag: str) -> Optional[str]:
+    """
+    If-None-Match 中与 etag 匹配的验证器（按客户端发送的原样返回），没有时返回None
+    使用弱比较：nginx开启gzip后会把强ETag改成 W/"..."；客户端持有的是任一编码版本的ETag时都算匹配
+    """
+    if not header:
+        return None
+    for sent in header.split(','):
+        sent = sent.strip()
+        candidate = sent[2:] if sent.startswith('W/') else sent
+        for suffix in _ENCODING_SUFFIX.values():
+            if candidate.endswith(suffix + '"'):
+                candidate = candidate[:-len(suffix) - 1] + '"'
+                break
+        if candidate == etag:
+            return sent
+    return None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    return header.strip() == '*' or matching_etag(header, etag) is not None
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: float) -> bool:
+    """请求中的验证器仍然有效时返回True；有 If-None-Match 时忽略 If-Modified-Since"""
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP日期只精确到秒
+        return int(last_modified) <= since
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    按 Accept-Encoding 选择压缩算法：取q值较高的一个，相同时优先brotli（已安装时），都不接受时返回None
+    明确列出的编码使用自己的q值（例如 gzip;q=0 表示拒绝gzip），没有列出的才使用 * 的q值
+    """
+    if not accept_encoding:
+        return None
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            param = param.replace(' ', '')
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(candidates, key=lambda name: qualities.get(name, qualities.get('*', 0.0)))
+    return best if qualities.get(best, qualities.get('*', 0.0)) > 0 else None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=HTTP_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=HTTP_GZIP_LEVEL, mtime=0)
+
+
+class ResponseCache:
+    """
+    以 (ETag, 编码) 为键的响应体LRU缓存，按总字节数限制大小
+    ETag已包含库版本和请求参数，所以库变化后旧条目不会再被命中，随LRU淘汰
+    """
+
+    def __init__(self, max_bytes: int = HTTP_RESPONSE_CACHE_BYTES, min_size: int = HTTP_COMPRESS_MIN_BYTES):
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple[str, Optional[str]]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def _put(self, key: Tuple[str, Optional[str]], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get(self, etag: str, encoding: Optional[str], render: Callable[[], bytes]) -> Tuple[bytes, Optional[str]]:
+        """
+        返回 (响应体, 实际使用的编码)；未缓存时调用 render 生成原始响应体，再按需压缩
+        小于 min_size 的响应体不压缩
+        """
+        if encoding is not None:
+            body = self._get((etag, encoding))
+            if body is not None:
+                return body, encoding
+        identity = self._get((etag, None))
+        if identity is None:
+            identity = render()
+            self._put((etag, None), identity)
+        if encoding is None or len(identity) < self.min_size:
+            return identity, None
+        body = _compress(identity, encoding)
+        self._put((etag, encoding), body)
+        return body, encoding
+
+    def variant_etag(self, etag: str, encoding: Optional[str]) -> Optional[str]:
+        """
+        已缓存时返回该请求的200响应会带的ETag（小响应体不压缩，所以要看缓存的响应体），
+        不调用 render；未缓存时返回None
+        """
+        with self._lock:
+            if encoding is not None and (etag, encoding) in self._entries:
+                return etag[:-1] + _ENCODING_SUFFIX[encoding] + '"'
+            identity = self._entries.get((etag, None))
+        if identity is None:
+            return None
+        if encoding is None or len(identity) < self.min_size:
+            return etag
+        return etag[:-1] + _ENCODING_SUFFIX[encoding] + '"'
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+def variant_headers(headers: Dict[str, str], encoding: Optional[str]) -> Dict[str, str]:
+    """给某个编码版本的响应加上 Content-Encoding、Vary 和对应的ETag"""
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = headers["ETag"][:-1] + _ENCODING_SUFFIX[encoding] + '"'
+    return headers
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """进程内共享的响应缓存"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -4,11 +4,10 @@ Gold Spider - 改进版黄金新闻爬虫
 专注于更稳定地抓取最新的黄金相关新闻
 """
 import time
-import json
 import logging
 import random
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 from urllib.parse import urlparse
@@ -25,8 +24,20 @@ from app.config import (
     REQUEST_DELAY,
     GOLD_KEYWORDS,
     SOURCE_WEIGHTS,
-    JSON_DB_PATH
+    CORE_KEYWORDS,
+    SECONDARY_KEYWORDS,
+    PRICE_KEYWORDS,
+    MAX_ARTICLES_PER_SOURCE,
+    FETCH_BUDGET_TOTAL,
+    FETCH_BUDGET_PER_SOURCE,
+    FETCH_MIN_SCORE
 )
+from app.keyword_matcher import gold_matcher
+from app.bm25_index import get_index
+from app.dedup import filter_near_duplicates
+from app.url_canonical import LinkIndex, canonicalize_url, dedupe_by_link, url_key
+from app.clustering import StoryClusterer, has_body
+from app.article_store import get_store
 from app.proxy_manager import proxy_manager
 from app.arch_compat import (
     is_apple_silicon, 
@@ -55,12 +66,14 @@ class ImprovedGoldScraper:
         self.delay = REQUEST_DELAY
         self.keywords = GOLD_KEYWORDS
         self.source_weights = SOURCE_WEIGHTS
-        self.db_path = JSON_DB_PATH
+        self.matcher = gold_matcher
+        self.max_articles_per_source = MAX_ARTICLES_PER_SOURCE
+        self.fetch_budget_total = FETCH_BUDGET_TOTAL
+        self.fetch_budget_per_source = FETCH_BUDGET_PER_SOURCE
+        self.fetch_min_score = FETCH_MIN_SCORE
+        self.store = get_store()
         self.use_proxies = use_proxies
         
-        # 确保数据目录存在
-        Path(self.db_path).parent.mkdir(exist_ok=True)
-        
         # 根据系统架构决定使用哪种User-Agent列表
         if is_apple_silicon():
             logger.info("使用ARM Mac兼容的User-Agent")
@@ -98,6 +111,9 @@ class ImprovedGoldScraper:
         # 保存无效URLs
         self.invalid_urls = set()
         
+        # 故事聚类器，每次运行时创建
+        self.clusterer = None
+        
         # 如果启用代理，设置代理管理器
         if self.use_proxies:
             proxy_manager.use_proxies = True
@@ -274,12 +290,14 @@ class ImprovedGoldScraper:
             if url.startswith('/'):  # 相对链接
                 base_url = f"{urlparse(source_url).scheme}://{urlparse(source_url).netloc}"
                 url = f"{base_url}{url}"
+            url = canonicalize_url(url)
                 
             # 跳过已处理的链接
-            if url in seen_urls:
+            key = url_key(url)
+            if key in seen_urls:
                 continue
                 
-            seen_urls.add(url)
+            seen_urls.add(key)
             unique_links.append((link, url))
         
         logger.info(f"在 {domain} 找到 {len(unique_links)} 个唯一链接")
@@ -313,7 +331,8 @@ class ImprovedGoldScraper:
                     "summarized": False,
                     "content": "",
                     "summary": None,
-                    "score": self.calculate_relevance_score(title, domain)
+                    "score": self.calculate_relevance_score(title, domain),
+                    "score_profile": "scraper"
                 }
                 
                 articles.append(article)
@@ -324,22 +343,18 @@ class ImprovedGoldScraper:
         # 按相关性分数排序
         articles.sort(key=lambda x: x.get('score', 0), reverse=True)
         
-        # 只保留最相关的前10篇文章
-        return articles[:10] if len(articles) > 10 else articles
+        # 只保留最相关的前N篇文章，是否抓取正文由抓取预算决定
+        return articles[:self.max_articles_per_source]
         
     def is_related_to_gold(self, text: str) -> bool:
         """检查文本是否与黄金相关"""
-        text = text.lower()
+        hits = self.matcher.match(text)
         # 核心关键词 - 任何一个都会直接匹配
-        core_keywords = ["gold", "silver", "precious metal", "bullion", "xau"]
-        for keyword in core_keywords:
-            if keyword in text:
-                return True
+        if any(keyword in hits for keyword in CORE_KEYWORDS):
+            return True
                 
         # 次要关键词 - 至少需要两个匹配
-        secondary_keywords = ["price", "market", "invest", "troy ounce", "etf", 
-                            "trading", "inflation", "central bank", "fed", "safe haven"]
-        matches = sum(1 for kw in secondary_keywords if kw in text)
+        matches = sum(1 for kw in SECONDARY_KEYWORDS if kw in hits)
         return matches >= 2
         
     def calculate_relevance_score(self, title: str, domain: str) -> float:
@@ -347,27 +362,23 @@ class ImprovedGoldScraper:
         score = 0.0
         
         # 1. 域名权重 - 有些源更可信
-        domain_base = domain.split('.')[-2] + '.' + domain.split('.')[-1]
         domain_score = self.source_weights.get(domain, 1.0)
         score += domain_score
         
-        # 2. 标题关键词 - 标题越相关，分数越高
-        title = title.lower()
+        # 2. 标题关键词 - 标题越相关，分数越高（一次扫描得到全部命中及其位置）
+        hits = self.matcher.match(title)
         
         # 核心关键词给高分
-        core_keywords = ["gold", "silver", "precious metal", "bullion", "xau"]
-        for keyword in core_keywords:
-            if keyword in title:
+        for keyword in CORE_KEYWORDS:
+            if keyword in hits:
                 score += 5.0
                 # 如果在标题开头，额外加分
-                if title.startswith(keyword):
+                if hits[keyword] == 0:
                     score += 2.0
         
         # 价格相关额外加分
-        price_keywords = ["price", "rally", "surge", "plunge", "drop", "rise", 
-                         "soar", "jump", "fall", "crash", "record", "high", "low"]
-        for keyword in price_keywords:
-            if keyword in title:
+        for keyword in PRICE_KEYWORDS:
+            if keyword in hits:
                 score += 1.0
         
         return score
@@ -533,30 +544,63 @@ class ImprovedGoldScraper:
         logger.info(f"总共抓取了 {len(all_articles)} 篇文章")
         return all_articles
         
-    def fetch_content_for_articles(self, articles: List[Dict]) -> List[Dict]:
-        """获取文章的正文内容"""
-        for i, article in enumerate(articles):
-            # 跳过已有内容的文章
-            if article.get('content') and len(article.get('content', '')) > 200:
+    def select_fetch_candidates(self, articles: List[Dict]) -> List[Dict]:
+        """按分数从高到低挑选值得抓取正文的文章，受总预算和单源预算限制"""
+        candidates = [
+            article for article in articles
+            # 跳过已有内容的文章和已知无效URL
+            if not (article.get('content') and len(article.get('content', '')) > 200)
+            and article.get('link') not in self.invalid_urls
+        ]
+        candidates.sort(key=lambda x: x.get('score', 0), reverse=True)
+        
+        selected = []
+        per_source: Dict[str, int] = {}
+        # 同一故事簇只抓取一篇正文
+        covered = self.clusterer.covered_clusters() if self.clusterer else set()
+        for article in candidates:
+            # 低于阈值的文章只保留标题和摘要
+            if article.get('score', 0) < self.fetch_min_score:
+                break
+            if self.fetch_budget_total is not None and len(selected) >= self.fetch_budget_total:
+                break
+                
+            source = article.get('source', '')
+            if self.fetch_budget_per_source is not None and per_source.get(source, 0) >= self.fetch_budget_per_source:
                 continue
-            
-            # 检查URL是否有效    
-            url = article.get('link')
-            if url in self.invalid_urls:
-                logger.warning(f"跳过已知无效文章URL: {url}")
+                
+            cluster_id = article.get('cluster_id')
+            if cluster_id and cluster_id in covered:
                 continue
                 
+            if cluster_id:
+                covered.add(cluster_id)
+            per_source[source] = per_source.get(source, 0) + 1
+            selected.append(article)
+            
+        skipped = len(candidates) - len(selected)
+        if skipped:
+            logger.info(f"抓取预算: 选中 {len(selected)} 篇文章抓取正文，{skipped} 篇只保留标题和摘要")
+        return selected
+        
+    def fetch_content_for_articles(self, articles: List[Dict]) -> List[Dict]:
+        """按抓取预算获取文章的正文内容"""
+        selected = self.select_fetch_candidates(articles)
+        
+        for i, article in enumerate(selected):
             # 获取内容
             content = self.extract_content(article)
             if content:
                 article['content'] = content
+                if self.clusterer and has_body(article):
+                    self.clusterer.mark_body(article.get('cluster_id'))
                 if not article.get('summary'):
                     # 提取前几句作为摘要
                     sentences = re.split(r'(?<=[.!?])\s+', content)
                     article['summary'] = ' '.join(sentences[:3]) if len(sentences) > 3 else content[:300]
                     
             # 友好地等待，避免请求过快
-            if i < len(articles) - 1:  # 不是最后一篇
+            if i < len(selected) - 1:  # 不是最后一篇
                 # 添加随机延迟
                 delay_time = self.delay * (0.5 + random.random())
                 logger.debug(f"等待 {delay_time:.2f} 秒后继续下一篇文章")
@@ -564,40 +608,58 @@ class ImprovedGoldScraper:
                 
         return articles
     
+    def load_existing_articles(self) -> List[Dict]:
+        """加载数据库中的现有文章"""
+        existing_articles = self.store.load_all(with_content=True)
+        logger.info(f"从数据库加载了 {len(existing_articles)} 篇现有文章")
+        return existing_articles
+    
     def update_database(self, articles: List[Dict]) -> None:
         """更新数据库，添加新文章"""
-        existing_articles = []
-        
-        # 加载现有数据
-        if Path(self.db_path).exists():
-            try:
-                with open(self.db_path, 'r') as f:
-                    existing_articles = json.load(f)
-                logger.info(f"从数据库加载了 {len(existing_articles)} 篇现有文章")
-            except json.JSONDecodeError:
-                logger.error("数据库文件格式错误，将创建新文件")
-                
-        # 过滤掉旧的文章（超过14天）
-        two_weeks_ago = (datetime.now() - timedelta(days=14)).isoformat()
-        existing_articles = [
-            article for article in existing_articles
-            if article.get('fetched_at', '') > two_weeks_ago
+        # 加载现有数据，记录版本号以便与并发写入合并
+        version, existing_articles = self.store.load_versioned(with_content=True)
+        
+        # 按规范URL去重（同时清理库中已有的重复链接），再去掉与已有文章近似重复的转载稿
+        link_index = LinkIndex()
+        kept_articles = dedupe_by_link(existing_articles, link_index)
+        kept_links = {article.get('link') for article in kept_articles}
+        removed_links = [
+            article.get('link') for article in existing_articles
+            if article.get('link') not in kept_links
         ]
+        new_articles = dedupe_by_link(articles, link_index)
+        new_articles = filter_near_duplicates(new_articles, kept_articles)
         
-        # 检查URL去重
-        existing_urls = {article.get('link') for article in existing_articles}
-        new_articles = [article for article in articles if article.get('link') not in existing_urls]
-        
-        # 合并和排序
-        updated_articles = new_articles + existing_articles
-        
-        # 保存数据库
+        # 保存数据库 - 只写入新文章和删除的链接
         try:
-            with open(self.db_path, 'w') as f:
-                json.dump(updated_articles, f, indent=2)
+            self.store.commit(upserts=new_articles, deletes=removed_links, expected_version=version)
             logger.info(f"添加了 {len(new_articles)} 篇新文章到数据库")
         except Exception as e:
             logger.error(f"保存数据库时出错: {e}")
+            return new_articles
+            
+        # 执行保留策略（只查询并删除即将过期的文章）
+        try:
+            expired_links = self.store.apply_retention()
+            removed_links += list(expired_links)
+            kept_links -= expired_links
+        except Exception as e:
+            logger.error(f"执行保留策略时出错: {e}")
+            
+        # 增量更新BM25正文索引
+        try:
+            index = get_index()
+            index.add_missing(new_articles)
+            index.remove_links(removed_links)
+        except Exception as e:
+            logger.error(f"更新BM25索引时出错: {e}")
+            
+        # 保存故事簇，去掉未入库或已过期的成员
+        if self.clusterer:
+            try:
+                self.clusterer.save(valid_links=kept_links | {article.get('link') for article in new_articles})
+            except Exception as e:
+                logger.error(f"保存故事簇时出错: {e}")
             
         return new_articles
     
@@ -611,6 +673,11 @@ class ImprovedGoldScraper:
         # 抓取所有源
         articles = self.scrape_all_sources()
         
+        # 归入故事簇，同一事件的多篇报道只抓取一篇正文
+        self.clusterer = StoryClusterer()
+        self.clusterer.index_store(self.store)
+        self.clusterer.assign_many(articles)
+        
         # 获取内容
         if articles:
             articles = self.fetch_content_for_articles(articles)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+关键词匹配器 - 基于Aho-Corasick自动机的多模式匹配
+一次扫描文本即可找出所有关键词命中，替代逐个关键词的子串查找
+"""
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from app.config import (
+    GOLD_KEYWORDS,
+    CORE_KEYWORDS,
+    SECONDARY_KEYWORDS,
+    PRICE_KEYWORDS,
+    KEYWORD_WEIGHTS
+)
+
+
+class KeywordMatcher:
+    """Aho-Corasick多模式关键词匹配器"""
+
+    def __init__(self, keywords: Iterable[str], word_boundary: bool = False):
+        """
+        构建自动机
+
+        Args:
+            keywords: 关键词列表（大小写不敏感，统一转为小写）
+            word_boundary: 是否要求命中位置两侧为单词边界
+        """
+        self.word_boundary = word_boundary
+        self.keywords = sorted({kw.lower() for kw in keywords if kw})
+
+        # 节点以列表下标表示: 转移表、失败指针、输出（以该节点结尾的关键词）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for keyword in self.keywords:
+            self._add(keyword)
+        self._build_failure_links()
+
+    def _add(self, keyword: str) -> None:
+        """向字典树中插入一个关键词"""
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(keyword)
+
+    def _build_failure_links(self) -> None:
+        """广度优先构建失败指针，并合并后缀节点的输出"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == '_'
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """扫描文本，依次产出 (起始位置, 关键词)，包含重叠命中"""
+        if not text:
+            return
+        text = text.lower()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not output[node]:
+                continue
+
+            for keyword in output[node]:
+                start = end - len(keyword) + 1
+                if self.word_boundary:
+                    if start > 0 and self._is_word_char(text[start - 1]):
+                        continue
+                    if end + 1 < len(text) and self._is_word_char(text[end + 1]):
+                        continue
+                yield start, keyword
+
+    def match(self, text: str) -> Dict[str, int]:
+        """返回命中的关键词及其首次出现的位置"""
+        hits: Dict[str, int] = {}
+        for start, keyword in self.iter_matches(text):
+            if keyword not in hits:
+                hits[keyword] = start
+        return hits
+
+    def contains_any(self, text: str) -> bool:
+        """文本中是否至少命中一个关键词（命中即停止扫描）"""
+        for _ in self.iter_matches(text):
+            return True
+        return False
+
+
+# 单例实例 - 由配置中的关键词表统一编译，所有相关性判断与评分共用
+gold_matcher = KeywordMatcher(
+    list(GOLD_KEYWORDS)
+    + CORE_KEYWORDS
+    + SECONDARY_KEYWORDS
+    + PRICE_KEYWORDS
+    + list(KEYWORD_WEIGHTS)
+)
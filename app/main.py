@@ -33,6 +33,10 @@ def parse_args():
     parser.add_argument("--debug", action="store_true", help="启用调试日志")
     parser.add_argument("--disable-compat", action="store_true", help="禁用架构兼容性支持")
     parser.add_argument("--legacy", action="store_true", help="使用旧版爬虫")
+    parser.add_argument("--rescore", action="store_true", help="使用当前权重重新计算数据库中所有文章的分数")
+    parser.add_argument("--rebuild-search", action="store_true", help="从文章库重建全文检索索引")
+    parser.add_argument("--migrate-sqlite", action="store_true", help="把JSON数据库中的文章导入SQLite（重复执行会覆盖同链接的文章）")
+    parser.add_argument("--migrate-blobs", action="store_true", help="把文章中内联的正文迁移到内容寻址存储")
     
     return parser.parse_args()
 
@@ -102,13 +106,51 @@ def run_legacy_scraper():
         logger.error(f"无法导入旧版爬虫: {e}")
         return 0
 
+def run_rescore():
+    """使用当前权重批量重新评分"""
+    from app.scoring import rescore_database
+    logger.info("开始批量重新评分...")
+    changed = rescore_database()
+    logger.info(f"重新评分完成，{changed} 篇文章分数变化")
+    return 0
+
+def run_migrate_sqlite():
+    """把JSON文件中的文章迁移到SQLite"""
+    from app.storage import SQLiteStorage
+    storage = SQLiteStorage(json_path=None)
+    count = storage.migrate_from_json(force=True)
+    logger.info(f"迁移完成，导入 {count} 篇文章到 {storage.path}")
+    return 0
+
+def run_rebuild_search():
+    """重建全文检索索引"""
+    from app.article_store import get_store
+    count = get_store().rebuild_search_index()
+    logger.info(f"全文索引重建完成，共 {count} 篇文章")
+    return 0
+
+def run_migrate_blobs():
+    """把内联正文迁移到内容寻址存储"""
+    from app.article_store import get_store
+    count = get_store().externalize_bodies()
+    logger.info(f"正文迁移完成，共 {count} 篇文章")
+    return 0
+
 def main():
     """主函数"""
     args = parse_args()
     setup_environment(args)
     
     try:
-        if args.legacy:
+        if args.rescore:
+            return run_rescore()
+        elif args.rebuild_search:
+            return run_rebuild_search()
+        elif args.migrate_sqlite:
+            return run_migrate_sqlite()
+        elif args.migrate_blobs:
+            return run_migrate_blobs()
+        elif args.legacy:
             return run_legacy_scraper()
         else:
             return run_improved_scraper(args)
@@ -3,7 +3,6 @@
 改进的新闻聚合器 - 使用RSS和API而非不可靠的网页爬取
 专注于获取实时、准确的黄金市场新闻
 """
-import json
 import logging
 import re
 import requests
@@ -19,8 +18,14 @@ from app.config import (
     NEWS_API_QUERY,
     ALTERNATIVE_NEWS_APIS,
     GOLD_KEYWORDS,
-    JSON_DB_PATH
+    KEYWORD_WEIGHTS
 )
+from app.keyword_matcher import gold_matcher
+from app.bm25_index import get_index
+from app.dedup import filter_near_duplicates
+from app.url_canonical import LinkIndex, canonicalize_url, dedupe_by_link
+from app.clustering import StoryClusterer
+from app.article_store import get_store
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -33,7 +38,8 @@ class ReliableNewsAggregator:
         self.rss_feeds = GOLD_RSS_FEEDS
         self.api_key = NEWS_API_KEY
         self.keywords = GOLD_KEYWORDS
-        self.db_path = JSON_DB_PATH
+        self.matcher = gold_matcher
+        self.store = get_store()
         
     def fetch_from_newsapi(self) -> List[Dict]:
         """从NewsAPI获取新闻"""
@@ -64,13 +70,16 @@ class ReliableNewsAggregator:
                         
                     article = {
                         'title': item.get('title', '').strip(),
-                        'link': item.get('url', ''),
+                        'link': canonicalize_url(item.get('url', '')),
                         'source': urlparse(item.get('url', '')).netloc.replace('www.', ''),
                         'pub_date': self.parse_iso_date(item.get('publishedAt')),
                         'fetched_at': datetime.now(timezone.utc).isoformat(),
                         'content': item.get('description', '') + '\n\n' + (item.get('content') or ''),
                         'summary': item.get('description', ''),
+                        # 评分所用的原始描述；summary 之后会被LLM摘要覆盖，批量重新评分使用这个字段
+                        'feed_summary': item.get('description', ''),
                         'score': self.calculate_relevance_score(item.get('title', ''), item.get('description', '')),
+                        'score_profile': 'aggregator',
                         'summarized': False
                     }
                     
@@ -109,13 +118,15 @@ class ReliableNewsAggregator:
                 for entry in feed.entries[:10]:  # 限制每个源最多10篇文章
                     article = {
                         'title': entry.get('title', '').strip(),
-                        'link': entry.get('link', ''),
+                        'link': canonicalize_url(entry.get('link', '')),
                         'source': urlparse(rss_url).netloc.replace('www.', ''),
                         'pub_date': self.parse_feed_date(entry),
                         'fetched_at': datetime.now(timezone.utc).isoformat(),
                         'content': self.extract_content_from_entry(entry),
                         'summary': entry.get('summary', ''),
+                        'feed_summary': entry.get('summary', ''),
                         'score': self.calculate_relevance_score(entry.get('title', ''), entry.get('summary', '')),
+                        'score_profile': 'aggregator',
                         'summarized': False
                     }
                     
@@ -191,19 +202,13 @@ class ReliableNewsAggregator:
     
     def calculate_relevance_score(self, title: str, description: str) -> float:
         """计算文章相关性分数"""
-        text = (title + ' ' + description).lower()
+        text = title + ' ' + description
         score = 0.0
         
-        # 黄金相关关键词权重
-        gold_keywords = {
-            'gold': 10, 'bullion': 8, 'precious metals': 8,
-            'xau': 7, 'gold price': 12, 'gold market': 10,
-            'central bank': 6, 'inflation': 5, 'safe haven': 8,
-            'silver': 6, 'platinum': 5, 'palladium': 5
-        }
-        
-        for keyword, weight in gold_keywords.items():
-            if keyword in text:
+        # 黄金相关关键词权重 - 一次扫描得到所有命中
+        hits = self.matcher.match(text)
+        for keyword, weight in KEYWORD_WEIGHTS.items():
+            if keyword in hits:
                 score += weight
         
         return min(score, 20.0)  # 最高20分
@@ -226,9 +231,9 @@ class ReliableNewsAggregator:
             
         return True
     
-    def remove_duplicates(self, articles: List[Dict]) -> List[Dict]:
-        """去除重复文章"""
-        seen_urls = set()
+    def remove_duplicates(self, articles: List[Dict], history: Optional[List[Dict]] = None) -> List[Dict]:
+        """去除重复文章：先按URL和标题精确去重，再去掉与历史或本批次近似重复的转载稿"""
+        seen_links = LinkIndex()
         seen_titles = set()
         unique_articles = []
         
@@ -236,50 +241,71 @@ class ReliableNewsAggregator:
             url = article.get('link', '')
             title = article.get('title', '').strip().lower()
             
-            if url not in seen_urls and title not in seen_titles:
-                seen_urls.add(url)
+            if url not in seen_links and title not in seen_titles:
+                seen_links.add(article)
                 seen_titles.add(title)
                 unique_articles.append(article)
         
-        return unique_articles
+        # 已在库中的链接交给 update_database 处理，这里只比较其余的历史文章
+        history = [article for article in (history or []) if article.get('link', '') not in seen_links]
+        return filter_near_duplicates(unique_articles, history)
     
     def load_existing_articles(self) -> List[Dict]:
-        """加载现有文章"""
-        try:
-            with open(self.db_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-    
-    def save_articles(self, articles: List[Dict]) -> None:
-        """保存文章到数据库"""
-        # 确保目录存在
-        self.db_path.parent.mkdir(exist_ok=True)
-        
-        with open(self.db_path, 'w', encoding='utf-8') as f:
-            json.dump(articles, f, ensure_ascii=False, indent=2)
+        """加载现有文章（近似去重需要正文）"""
+        return self.store.load_all(with_content=True)
     
     def update_database(self, new_articles: List[Dict]) -> None:
         """更新数据库"""
-        existing_articles = self.load_existing_articles()
-        existing_urls = {article.get('link') for article in existing_articles}
+        # 按规范URL建立索引（同时清理库中已有的重复链接）
+        version, loaded_articles = self.store.load_versioned(with_content=True)
+        link_index = LinkIndex()
+        existing_articles = dedupe_by_link(loaded_articles, link_index)
+        existing_links = {article.get('link') for article in existing_articles}
+        duplicate_links = {
+            article.get('link') for article in loaded_articles
+            if article.get('link') not in existing_links
+        }
         
         # 只添加新文章
-        truly_new_articles = [
-            article for article in new_articles 
-            if article.get('link') not in existing_urls
-        ]
+        truly_new_articles = dedupe_by_link(new_articles, link_index)
         
         if truly_new_articles:
-            # 合并文章并按日期排序
-            all_articles = existing_articles + truly_new_articles
-            all_articles.sort(key=lambda x: x.get('pub_date', ''), reverse=True)
-            
-            # 限制总数量（保留最新的100篇）
-            all_articles = all_articles[:100]
+            # 把新文章归入跨来源故事簇
+            clusterer = StoryClusterer()
+            clusterer.index_articles(existing_articles)
+            clusterer.assign_many(truly_new_articles)
             
-            self.save_articles(all_articles)
+            # 只写入新文章和被删除的重复链接
+            self.store.commit(
+                upserts=truly_new_articles,
+                deletes=duplicate_links,
+                expected_version=version
+            )
             logger.info(f"添加了 {len(truly_new_articles)} 篇新文章到数据库")
+            
+            # 执行保留策略（只查询并删除即将过期的文章）
+            dropped_links = set()
+            try:
+                dropped_links = self.store.apply_retention()
+            except Exception as e:
+                logger.error(f"执行保留策略时出错: {e}")
+            all_articles = [
+                article for article in existing_articles + truly_new_articles
+                if article.get('link') not in dropped_links
+            ]
+            
+            try:
+                clusterer.save(valid_links={article.get('link') for article in all_articles})
+            except Exception as e:
+                logger.error(f"保存故事簇时出错: {e}")
+            
+            # 增量更新BM25正文索引
+            try:
+                index = get_index()
+                index.add_missing(article for article in truly_new_articles if article.get('link') not in dropped_links)
+                index.remove_links(dropped_links | duplicate_links)
+            except Exception as e:
+                logger.error(f"更新BM25索引时出错: {e}")
         else:
             logger.info("没有新文章需要添加")
     
@@ -298,7 +324,7 @@ class ReliableNewsAggregator:
         all_articles.extend(rss_articles)
         
         # 去重和排序
-        unique_articles = self.remove_duplicates(all_articles)
+        unique_articles = self.remove_duplicates(all_articles, history=self.load_existing_articles())
         unique_articles.sort(key=lambda x: x.get('score', 0), reverse=True)
         
         logger.info(f"总共聚合了 {len(unique_articles)} 篇独特文章")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Parquet导出 - 把文章库和归档按抓取日期（UTC）写成Hive风格分区的Parquet文件，供分析使用
+  EXPORT_DIR/day=YYYY-MM-DD/part-<时间戳>.parquet
+列带类型：fetched_at 为UTC时间戳，source 为字典编码的分类列，score 为float64，正文列可选
+导出是增量的：只写尚未导出、且按UTC已经结束的日期分区（之后抓取的文章不会再落入这些日期）
+抓取时间字符串有的带时区（聚合器，UTC），有的是本地时间（爬虫），所以按解析后的UTC日期分区
+需要安装 pyarrow；pandas 可直接读取：pd.read_parquet(EXPORT_DIR)
+"""
+import json
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from app.archive import ArticleArchive, get_archive
+from app.article_store import get_store
+from app.config import EXPORT_DIR, EXPORT_INCLUDE_BODY, EXPORT_COMPRESSION
+from app.storage import FileLock, atomic_write
+
+logger = logging.getLogger("parquet_export")
+
+
+def export_schema(include_body: bool = False):
+    """导出文件的列类型"""
+    fields = [
+        pa.field('link', pa.string()),
+        pa.field('title', pa.string()),
+        pa.field('source', pa.dictionary(pa.int32(), pa.string())),
+        pa.field('pub_date', pa.string()),
+        pa.field('fetched_at', pa.timestamp('us', tz='UTC')),
+        pa.field('score', pa.float64()),
+        pa.field('summary', pa.string()),
+        pa.field('cluster_id', pa.string()),
+        pa.field('content_length', pa.int64()),
+    ]
+    if include_body:
+        fields.append(pa.field('content', pa.string()))
+    return pa.schema(fields)
+
+
+def _utc(value: Optional[str]) -> Optional[datetime]:
+    """抓取时间是本地时间的ISO字符串，转换为UTC"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).astimezone(timezone.utc)
+    except ValueError:
+        return None
+
+
+def _utc_day(value: Optional[str]) -> Optional[str]:
+    """抓取时间的UTC日期 YYYY-MM-DD"""
+    moment = _utc(value)
+    return moment.date().isoformat() if moment is not None else None
+
+
+def _shift(day: str, days: int) -> str:
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetExporter:
+    """按日期分区增量导出文章库和归档"""
+
+    def __init__(self, root: Path = EXPORT_DIR, store=None,
+                 archive: Optional[ArticleArchive] = None,
+                 include_body: bool = EXPORT_INCLUDE_BODY):
+        if pa is None:
+            raise RuntimeError("Parquet导出需要安装 pyarrow（pip install pyarrow）")
+        self.root = Path(root)
+        self.store = store if store is not None else get_store()
+        self.archive = archive if archive is not None else get_archive()
+        self.include_body = include_body
+        self.schema = export_schema(include_body)
+        self.state_path = self.root / "_export_state.json"
+        self._lock = FileLock(self.root / "_export.lock")
+
+    def exported_days(self) -> Dict[str, Dict]:
+        """已导出的日期分区：日期 -> {file, rows}"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('days', {})
+        except FileNotFoundError:
+            return {}
+
+    def _candidate_days(self, before: str) -> List[str]:
+        """归档和文章库中出现过、早于 before 的UTC日期"""
+        # 归档分段按抓取时间字符串的日期划分，本地时间与UTC最多相差一天
+        days = {
+            _shift(segment['day'], offset)
+            for segment in self.archive.manifest()
+            for offset in (-1, 0, 1)
+        }
+        # 字符串比较不区分时区，多查一天再按UTC日期过滤
+        days.update(
+            _utc_day(article.get('fetched_at'))
+            for article in self.store.query(until=_shift(before, 1))
+        )
+        return sorted(day for day in days if day and day < before)
+
+    def _articles_for_day(self, day: str) -> Iterator[Dict]:
+        """UTC日期为 day 的全部文章；同一链接在归档和库中都有时以库中的为准"""
+        # 按字符串查询前后各放宽一天，再按解析后的UTC日期过滤
+        since, until = _shift(day, -1), _shift(day, 2)
+        hot = {
+            article['link']: article
+            for article in self.store.query(since=since, until=until)
+            if article.get('link') and _utc_day(article.get('fetched_at')) == day
+        }
+        for article in self.archive.iter_range(since=since, until=until):
+            if article.get('link') not in hot and _utc_day(article.get('fetched_at')) == day:
+                yield article
+        if self.include_body:
+            yield from self.store.get_many(hot, with_content=True)
+        else:
+            yield from hot.values()
+
+    def _row(self, article: Dict) -> Dict:
+        row = {
+            'link': article.get('link'),
+            'title': article.get('title'),
+            'source': article.get('source'),
+            'pub_date': article.get('pub_date'),
+            'fetched_at': _utc(article.get('fetched_at')),
+            'score': _float(article.get('score')),
+            'summary': article.get('summary'),
+            'cluster_id': article.get('cluster_id'),
+            'content_length': article.get('content_length', len(article.get('content') or '')),
+        }
+        if self.include_body:
+            row['content'] = article.get('content') or ''
+        return row
+
+    def _write_partition(self, day: str, rows: List[Dict]) -> str:
+        directory = self.root / f"day={day}"
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"part-{time.time_ns():x}.parquet"
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        tmp_path = directory / f".{name}.tmp"
+        pq.write_table(table, tmp_path, compression=EXPORT_COMPRESSION)
+        tmp_path.replace(directory / name)
+        return f"day={day}/{name}"
+
+    def export(self, until: Optional[str] = None) -> int:
+        """
+        导出尚未导出的已结束UTC日期（默认到UTC昨天为止），返回新写入的分区数
+        已导出的分区不会被重写，之后文章库中对这些文章的修改不会反映到导出中
+        """
+        before = until or datetime.now(timezone.utc).date().isoformat()
+        with self._lock:
+            exported = self.exported_days()
+            written = 0
+            for day in self._candidate_days(before):
+                if day in exported:
+                    continue
+                rows = [self._row(article) for article in self._articles_for_day(day)]
+                if not rows:
+                    continue
+                exported[day] = {'file': self._write_partition(day, rows), 'rows': len(rows)}
+                written += 1
+                # 每个分区写完即记录状态，中途失败时已写的分区不会重复导出
+                atomic_write(self.state_path, json.dumps({'days': exported}, indent=2))
+        logger.info(f"Parquet导出完成，新写入 {written} 个日期分区")
+        return written
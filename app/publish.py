@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+静态发布 - 把首页和文章页预渲染为HTML文件，由nginx直接提供，读请求不经过Python
+  PUBLISH_DIR/index.html
+  PUBLISH_DIR/article/<文章ID>.html
+页面与FastAPI的 / 和 /article/{id}（app/api.py）使用同一套数据和渲染函数：首页为排序、
+合并故事簇后的前 HOME_PAGE_SIZE 篇并带新文章推送脚本，文章页带按抓取时间的上一篇/下一篇
+文章页只在文章或其相邻文章变化时重新渲染，已删除文章的页面随之删除。发布状态记录在 _publish_state.json
+"""
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.article_cache import get_article_cache
+from app.config import PUBLISH_DIR
+from app.storage import FileLock, atomic_write
+
+logger = logging.getLogger("publish")
+
+
+def _fingerprint(article: Dict, newer: Optional[Dict], older: Optional[Dict]) -> str:
+    """文章页依赖的全部数据：文章的所有字段（正文由 content_ref 表示）和相邻文章的ID"""
+    page = [article, newer and newer['id'], older and older['id']]
+    return hashlib.sha1(json.dumps(page, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+class PagePublisher:
+    """把进程内共享文章缓存的当前版本发布为静态页面"""
+
+    def __init__(self, root: Path = PUBLISH_DIR):
+        self.root = Path(root)
+        # 首页排序（app/api.py 的 ranked_articles）使用共享缓存，这里必须是同一个
+        self.cache = get_article_cache()
+        self.state_path = self.root / "_publish_state.json"
+        self._lock = FileLock(self.root / "_publish.lock")
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"version": None, "pages": {}}
+
+    def _page_path(self, article_id: str) -> Path:
+        return self.root / "article" / f"{article_id}.html"
+
+    def publish(self, force: bool = False) -> Optional[int]:
+        """
+        发布当前版本，返回重新渲染的文章页数；版本和首页内容都未变化时返回None
+        force=True 时重新渲染全部页面（例如修改模板之后）
+        """
+        # 与FastAPI页面使用同一套渲染函数；api 导入本模块，所以按需导入
+        from app.api import HOME_PAGE_SIZE, ranked_articles, render_home, render_detail
+
+        with self._lock:
+            self.cache.invalidate()
+            snapshot = self.cache.snapshot()
+            # 首页随时间窗口移动而变化，所以除版本号外还比较首页的ETag
+            home, _, home_etag, _ = ranked_articles(limit=HOME_PAGE_SIZE, collapse=True)
+            state = self._load_state()
+            if (not force and state.get("version") == snapshot.version and state.get("home") == home_etag
+                    and (self.root / "index.html").exists()):
+                return None
+
+            start = time.perf_counter()
+            previous: Dict[str, str] = state.get("pages", {})
+            pages: Dict[str, str] = {}
+            rendered = 0
+            (self.root / "article").mkdir(parents=True, exist_ok=True)
+            for article in snapshot.articles:
+                newer, older = snapshot.index.neighbours(article['link'])
+                fingerprint = _fingerprint(article, newer, older)
+                pages[article['id']] = fingerprint
+                path = self._page_path(article['id'])
+                if not force and previous.get(article['id']) == fingerprint and path.exists():
+                    continue
+                atomic_write(path, render_detail(article, newer, older))
+                rendered += 1
+            # 首页最后写入，它链接到的文章页此时都已存在
+            atomic_write(self.root / "index.html", render_home(home))
+
+            removed = 0
+            for article_id in set(previous) - set(pages):
+                try:
+                    self._page_path(article_id).unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+
+            atomic_write(self.state_path, json.dumps({"version": snapshot.version, "home": home_etag, "pages": pages}))
+            elapsed = (time.perf_counter() - start) * 1000
+            logger.info(
+                f"静态页面已发布到版本 {snapshot.version}：渲染 {rendered} 篇文章页，"
+                f"删除 {removed} 篇，用时 {elapsed:.1f} 毫秒"
+            )
+            return rendered
+
+
+_publisher: Optional[PagePublisher] = None
+
+
+def get_publisher() -> PagePublisher:
+    """进程内共享的静态发布器"""
+    global _publisher
+    if _publisher is None:
+        _publisher = PagePublisher()
+    return _publisher
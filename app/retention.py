@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+文章保留策略引擎 - 由 config.RETENTION_POLICIES 声明的策略统一决定哪些文章被删除
+- 内容质量策略在文章写入或修改时检查（ArticleStore.commit）
+- 时间和数量策略由调度器定期运行，只查询并删除即将过期的文章，删除前写入归档（app/archive.py）
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.archive import ArticleArchive, get_archive
+from app.config import RETENTION_POLICIES, ARCHIVE_ENABLED
+
+logger = logging.getLogger("retention")
+
+
+def _links(articles: Iterable[Dict]) -> Set[str]:
+    return {article.get('link') for article in articles if article.get('link')}
+
+
+class RetentionPolicy:
+    """保留策略基类"""
+
+    name = ""
+
+    def expired(self, articles: List[Dict]) -> Set[str]:
+        """在给定文章中找出应删除的链接"""
+        raise NotImplementedError
+
+    def expired_in_store(self, store) -> Set[str]:
+        """在文章库中找出应删除的链接，默认遍历全库"""
+        return self.expired(list(store.iter_articles(with_content=True)))
+
+
+class MaxAgePolicy(RetentionPolicy):
+    """按抓取时间删除超过指定天数的文章"""
+
+    def __init__(self, days: float):
+        self.days = days
+        self.name = f"超过{days:g}天"
+
+    def cutoff(self) -> str:
+        return (datetime.now() - timedelta(days=self.days)).isoformat()
+
+    def expired(self, articles: List[Dict]) -> Set[str]:
+        cutoff = self.cutoff()
+        return _links(article for article in articles if article.get('fetched_at', '') <= cutoff)
+
+    def expired_in_store(self, store) -> Set[str]:
+        # 时间区间查询，SQLite上走 fetched_at 索引
+        return _links(store.query(until=self.cutoff()))
+
+
+class MaxCountPolicy(RetentionPolicy):
+    """最多保留指定数量的文章（可按来源分别计数），超出时删除抓取时间最早的"""
+
+    def __init__(self, count: int, per_source: bool = False):
+        self.count = count
+        self.per_source = per_source
+        self.name = f"每个来源超过{count}篇" if per_source else f"超过{count}篇"
+
+    def expired(self, articles: List[Dict]) -> Set[str]:
+        groups: Dict[Optional[str], List[Dict]] = {}
+        for article in articles:
+            groups.setdefault(article.get('source') if self.per_source else None, []).append(article)
+
+        expired: Set[str] = set()
+        for group in groups.values():
+            if len(group) > self.count:
+                group.sort(key=lambda x: x.get('fetched_at', ''), reverse=True)
+                expired.update(_links(group[self.count:]))
+        return expired
+
+    def expired_in_store(self, store) -> Set[str]:
+        # 只查询超出的部分：按抓取时间从旧到新取前 (数量 - 上限) 篇
+        if not self.per_source:
+            overflow = store.count() - self.count
+            if overflow <= 0:
+                return set()
+            return _links(store.query(order_by='fetched_at', descending=False, limit=overflow))
+
+        expired: Set[str] = set()
+        for source, total in store.source_counts().items():
+            overflow = total - self.count
+            if overflow <= 0:
+                continue
+            if source is None:
+                # 没有来源的文章无法按来源查询，只有这一组超出上限时才读取全部元数据
+                group = [a for a in store.query(order_by='fetched_at', descending=False) if a.get('source') is None]
+                expired |= _links(group[:overflow])
+            else:
+                expired |= _links(store.query(source=source, order_by='fetched_at', descending=False, limit=overflow))
+        return expired
+
+
+class ContentPolicy(RetentionPolicy):
+    """内容质量规则：字段匹配正则，或同时包含若干字符串的文章被删除"""
+
+    def __init__(self, name: str, field: str,
+                 pattern: Optional[str] = None,
+                 contains_all: Optional[List[str]] = None):
+        if pattern is None and not contains_all:
+            raise ValueError(f"内容策略 {name} 需要 pattern 或 contains_all")
+        self.name = name
+        self.field = field
+        self.pattern = re.compile(pattern) if pattern is not None else None
+        self.contains_all = list(contains_all or [])
+
+    def matches(self, article: Dict) -> bool:
+        value = article.get(self.field) or ''
+        if not isinstance(value, str) or not value:
+            return False
+        if self.pattern is not None and not self.pattern.search(value):
+            return False
+        return all(text in value for text in self.contains_all)
+
+    def expired(self, articles: List[Dict]) -> Set[str]:
+        return _links(article for article in articles if self.matches(article))
+
+
+def build_policy(spec: Dict) -> Optional[RetentionPolicy]:
+    """根据配置创建策略；数量或天数为 None 的策略视为关闭"""
+    kind = spec.get('type')
+    if kind == 'max_age':
+        return MaxAgePolicy(spec['days']) if spec.get('days') is not None else None
+    if kind in ('max_count', 'max_per_source'):
+        if spec.get('count') is None:
+            return None
+        return MaxCountPolicy(spec['count'], per_source=kind == 'max_per_source')
+    if kind == 'content':
+        return ContentPolicy(
+            spec.get('name', spec.get('field', '')),
+            spec['field'],
+            pattern=spec.get('pattern'),
+            contains_all=spec.get('contains_all')
+        )
+    raise ValueError(f"未知的保留策略类型: {kind}")
+
+
+class RetentionEngine:
+    """按顺序评估保留策略"""
+
+    def __init__(self, policies: Optional[List[RetentionPolicy]] = None,
+                 archive: Optional[ArticleArchive] = None):
+        if policies is None:
+            policies = [build_policy(spec) for spec in RETENTION_POLICIES]
+        self.policies = [policy for policy in policies if policy is not None]
+        if archive is None and ARCHIVE_ENABLED:
+            archive = get_archive()
+        self.archive = archive
+
+    @property
+    def content_policies(self) -> List[ContentPolicy]:
+        return [policy for policy in self.policies if isinstance(policy, ContentPolicy)]
+
+    def _evaluate(self, articles: Iterable[Dict]) -> List[Tuple[RetentionPolicy, Set[str]]]:
+        """按顺序评估全部策略，返回每个策略删除的链接；前面的策略删除的文章不参与后面策略的计数"""
+        remaining = list(articles)
+        results = []
+        for policy in self.policies:
+            links = policy.expired(remaining)
+            if links:
+                results.append((policy, links))
+                remaining = [article for article in remaining if article.get('link') not in links]
+        return results
+
+    def expired(self, articles: Iterable[Dict]) -> Set[str]:
+        """在给定文章上评估全部策略，返回应删除的链接"""
+        expired: Set[str] = set()
+        for _, links in self._evaluate(articles):
+            expired |= links
+        return expired
+
+    def rejected(self, articles: Iterable[Dict]) -> Set[str]:
+        """只评估内容质量规则，用于写入时检查新增或修改的文章"""
+        articles = list(articles)
+        rejected: Set[str] = set()
+        for policy in self.content_policies:
+            links = policy.expired(articles)
+            if links:
+                logger.info(f"删除 {len(links)} 篇命中内容规则「{policy.name}」的文章")
+                rejected |= links
+        return rejected
+
+    def _archive(self, store, links: Set[str]) -> bool:
+        """删除前把过期文章写入归档；归档失败时返回False，这些文章留到下次再处理"""
+        if self.archive is None or not links:
+            return True
+        try:
+            self.archive.archive(store.get_many(links, with_content=True))
+            return True
+        except Exception as e:
+            logger.error(f"归档过期文章时出错，本次不删除: {e}")
+            return False
+
+    def run(self, store, full: bool = False) -> Set[str]:
+        """
+        对文章库执行保留策略，返回被删除的链接
+        默认只运行时间和数量策略，每个策略只查询并删除即将过期的文章；
+        full=True 时对全库重新评估全部策略（例如新增了内容规则之后）
+        时间和数量策略删除的文章先写入归档，命中内容规则的文章直接删除
+        """
+        if full:
+            expired: Set[str] = set()
+            to_archive: Set[str] = set()
+            for policy, links in self._evaluate(store.iter_articles(with_content=True)):
+                expired |= links
+                if not isinstance(policy, ContentPolicy):
+                    to_archive |= links
+            if not self._archive(store, to_archive):
+                expired -= to_archive
+            if expired:
+                store.delete_links(expired)
+            logger.info(f"全量保留策略检查完成，删除了 {len(expired)} 篇文章")
+            return expired
+
+        expired: Set[str] = set()
+        for policy in self.policies:
+            if isinstance(policy, ContentPolicy):
+                continue
+            links = policy.expired_in_store(store)
+            if links and self._archive(store, links):
+                store.delete_links(links)
+                logger.info(f"保留策略「{policy.name}」删除了 {len(links)} 篇文章")
+                expired |= links
+        return expired
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 定时任务调度器
-负责定期运行新闻聚合任务
+负责定期运行新闻聚合任务、文章保留策略和增量备份
+开启静态发布（PUBLISH_ENABLED）时，聚合和保留策略运行后重新发布静态页面
 """
 import time
 import logging
@@ -9,6 +10,8 @@ import schedule
 from datetime import datetime
 from typing import Optional
 
+from app.config import RETENTION_INTERVAL_MINUTES, BACKUP_INTERVAL_MINUTES, PUBLISH_ENABLED
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -35,12 +38,50 @@ def run_news_aggregation():
         duration = (end_time - start_time).total_seconds()
         
         logger.info(f"新闻聚合完成，用时 {duration:.2f} 秒，获取 {len(articles)} 篇文章")
+        run_publish()
         return articles
         
     except Exception as e:
         logger.error(f"新闻聚合任务失败: {e}")
         return []
 
+def run_retention():
+    """运行保留策略，只删除即将过期的文章，并清理不再被引用的正文"""
+    try:
+        from app.article_store import get_store
+        from app.bm25_index import get_index
+        
+        store = get_store()
+        expired = store.apply_retention()
+        if expired:
+            get_index().remove_links(expired)
+        store.collect_garbage()
+        logger.info(f"保留策略运行完成，删除了 {len(expired)} 篇文章")
+        if expired:
+            run_publish()
+    except Exception as e:
+        logger.error(f"保留策略任务失败: {e}")
+
+def run_publish():
+    """把首页和文章页重新发布为静态文件（只渲染变化的文章页）"""
+    if not PUBLISH_ENABLED:
+        return
+    try:
+        from app.publish import get_publisher
+        
+        get_publisher().publish()
+    except Exception as e:
+        logger.error(f"静态发布失败: {e}")
+
+def run_backup():
+    """增量备份文章库，只写入上次备份后变化的文章"""
+    try:
+        from app.backup import get_backup_manager
+        
+        get_backup_manager().backup()
+    except Exception as e:
+        logger.error(f"备份任务失败: {e}")
+
 def run_scheduler_service(interval_minutes: float = 30.0):
     """运行调度服务"""
     logger.info(f"启动新闻聚合调度器，间隔 {interval_minutes} 分钟")
@@ -52,6 +93,8 @@ def run_scheduler_service(interval_minutes: float = 30.0):
     
     # 设置定时任务
     schedule.every(interval_minutes).minutes.do(run_news_aggregation)
+    schedule.every(RETENTION_INTERVAL_MINUTES).minutes.do(run_retention)
+    schedule.every(BACKUP_INTERVAL_MINUTES).minutes.do(run_backup)
     
     logger.info(f"开始定时调度，每 {interval_minutes} 分钟运行一次")
     
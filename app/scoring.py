@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+批量评分引擎 - 用NumPy对整个文章库重新计算相关性分数
+调整 SOURCE_WEIGHTS 或关键词权重后，无需重新抓取即可刷新历史文章的分数
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import (
+    SOURCE_WEIGHTS,
+    CORE_KEYWORDS,
+    PRICE_KEYWORDS,
+    KEYWORD_WEIGHTS
+)
+from app.keyword_matcher import gold_matcher
+from app.article_store import get_store
+
+logger = logging.getLogger("scoring")
+
+# 评分方式 - 与 ImprovedGoldScraper / ReliableNewsAggregator 的 calculate_relevance_score 对应
+PROFILE_SCRAPER = "scraper"
+PROFILE_AGGREGATOR = "aggregator"
+
+# 词项矩阵的字段：标题命中、标题开头命中、标题+摘要命中
+FIELD_TITLE = 0
+FIELD_TITLE_START = 1
+FIELD_TEXT = 2
+NUM_FIELDS = 3
+
+
+def score_summary(article: Dict) -> Optional[str]:
+    """
+    聚合器评分时使用的摘要：入库时保存的原始描述 feed_summary
+    旧数据没有该字段时，未经LLM摘要的 summary 即原始描述；已被摘要覆盖的无法还原，返回None
+    """
+    if 'feed_summary' in article:
+        return article['feed_summary'] or ''
+    if article.get('summarized'):
+        return None
+    return article.get('summary') or ''
+
+
+def article_profile(article: Dict) -> str:
+    """判断文章由哪种评分方式打分"""
+    profile = article.get('score_profile')
+    if profile:
+        return profile
+    # 旧数据没有 score_profile 字段：聚合器写入的 fetched_at 带UTC时区，爬虫写入的不带
+    fetched_at = article.get('fetched_at', '')
+    if '+' in fetched_at or fetched_at.endswith('Z'):
+        return PROFILE_AGGREGATOR
+    return PROFILE_SCRAPER
+
+
+class TermHitMatrix:
+    """文章 x (字段, 关键词) 的稀疏命中矩阵（COO格式）"""
+
+    def __init__(self, articles: List[Dict]):
+        self.vocabulary = gold_matcher.keywords
+        self.term_index = {term: i for i, term in enumerate(self.vocabulary)}
+        self.num_articles = len(articles)
+
+        rows: List[int] = []
+        cols: List[int] = []
+        vocab_size = len(self.vocabulary)
+        # 无法按入库时的输入重新评分的文章（聚合器文章的原始描述已丢失），保留原分数
+        self.keep_score = np.zeros(self.num_articles, dtype=bool)
+
+        for row, article in enumerate(articles):
+            title = article.get('title') or ''
+            summary = score_summary(article)
+            if summary is None:
+                if article_profile(article) == PROFILE_AGGREGATOR:
+                    self.keep_score[row] = True
+                summary = ''
+
+            for term, position in gold_matcher.match(title).items():
+                col = self.term_index[term]
+                rows.append(row)
+                cols.append(FIELD_TITLE * vocab_size + col)
+                if position == 0:
+                    rows.append(row)
+                    cols.append(FIELD_TITLE_START * vocab_size + col)
+
+            for term in gold_matcher.match(title + ' ' + summary):
+                rows.append(row)
+                cols.append(FIELD_TEXT * vocab_size + self.term_index[term])
+
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+
+        # 来源与评分方式按行编码，便于向量化查表
+        sources = [article.get('source', '') for article in articles]
+        self.source_names, self.source_ids = np.unique(np.asarray(sources, dtype=object), return_inverse=True)
+        self.is_aggregator = np.asarray(
+            [article_profile(article) == PROFILE_AGGREGATOR for article in articles],
+            dtype=bool
+        )
+
+    def weight_vector(self, field_weights: Dict[int, Dict[str, float]]) -> np.ndarray:
+        """把 {字段: {关键词: 权重}} 展开成与矩阵列对齐的权重向量"""
+        vocab_size = len(self.vocabulary)
+        weights = np.zeros(NUM_FIELDS * vocab_size, dtype=np.float64)
+        for field, term_weights in field_weights.items():
+            for term, weight in term_weights.items():
+                col = self.term_index.get(term.lower())
+                if col is not None:
+                    weights[field * vocab_size + col] = weight
+        return weights
+
+    def keyword_scores(self, weights: np.ndarray) -> np.ndarray:
+        """稀疏矩阵乘权重向量：一次 bincount 得到所有文章的关键词分"""
+        if self.num_articles == 0:
+            return np.zeros(0, dtype=np.float64)
+        return np.bincount(self.rows, weights=weights[self.cols], minlength=self.num_articles)
+
+
+class BatchScorer:
+    """批量评分器 - 权重来自配置，也可在调参时传入覆盖"""
+
+    def __init__(self,
+                 source_weights: Optional[Dict[str, float]] = None,
+                 keyword_weights: Optional[Dict[str, float]] = None,
+                 core_weight: float = 5.0,
+                 core_start_bonus: float = 2.0,
+                 price_weight: float = 1.0,
+                 default_source_weight: float = 1.0,
+                 max_aggregator_score: float = 20.0):
+        self.source_weights = SOURCE_WEIGHTS if source_weights is None else source_weights
+        self.keyword_weights = KEYWORD_WEIGHTS if keyword_weights is None else keyword_weights
+        self.core_weight = core_weight
+        self.core_start_bonus = core_start_bonus
+        self.price_weight = price_weight
+        self.default_source_weight = default_source_weight
+        self.max_aggregator_score = max_aggregator_score
+
+    def score_matrix(self, matrix: TermHitMatrix) -> np.ndarray:
+        """对命中矩阵中的所有文章计算分数"""
+        title_weights = {kw: self.core_weight for kw in CORE_KEYWORDS}
+        for kw in PRICE_KEYWORDS:
+            title_weights[kw] = title_weights.get(kw, 0.0) + self.price_weight
+
+        # 爬虫评分：来源权重 + 标题核心词/开头/价格词
+        scraper_weights = matrix.weight_vector({
+            FIELD_TITLE: title_weights,
+            FIELD_TITLE_START: {kw: self.core_start_bonus for kw in CORE_KEYWORDS}
+        })
+        source_scores = np.asarray(
+            [self.source_weights.get(name, self.default_source_weight) for name in matrix.source_names],
+            dtype=np.float64
+        )
+        scraper_scores = matrix.keyword_scores(scraper_weights)
+        if matrix.num_articles:
+            scraper_scores += source_scores[matrix.source_ids]
+
+        # 聚合器评分：标题+摘要的关键词权重，封顶
+        aggregator_weights = matrix.weight_vector({FIELD_TEXT: self.keyword_weights})
+        aggregator_scores = np.minimum(matrix.keyword_scores(aggregator_weights), self.max_aggregator_score)
+
+        return np.where(matrix.is_aggregator, aggregator_scores, scraper_scores)
+
+    def score_articles(self, articles: List[Dict]) -> np.ndarray:
+        """对文章列表计算分数（不修改文章）"""
+        return self.score_matrix(TermHitMatrix(articles))
+
+    def rescore_articles(self, articles: List[Dict]) -> List[Dict]:
+        """就地更新文章的 score 字段，返回分数发生变化的文章"""
+        matrix = TermHitMatrix(articles)
+        scores = self.score_matrix(matrix)
+        changed = []
+        for article, score, keep in zip(articles, scores.tolist(), matrix.keep_score.tolist()):
+            if not keep and article.get('score') != score:
+                article['score'] = score
+                changed.append(article)
+        return changed
+
+
+def rescore_database(scorer: Optional[BatchScorer] = None) -> int:
+    """用当前权重重新计算数据库中所有文章的分数，只写回分数变化的文章，返回变化的文章数"""
+    scorer = scorer or BatchScorer()
+    store = get_store()
+    articles = store.load_all()
+
+    start = time.perf_counter()
+    changed = scorer.rescore_articles(articles)
+    elapsed = (time.perf_counter() - start) * 1000
+    logger.info(f"重新评分 {len(articles)} 篇文章，用时 {elapsed:.1f} 毫秒，{len(changed)} 篇分数变化")
+
+    if changed:
+        # 只写回 score 字段，不覆盖并发写入的其他字段
+        store.update_fields({'link': article['link'], 'score': article['score']} for article in changed)
+
+    return len(changed)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+全文检索 - SQLite FTS5 索引文章标题和正文
+文章库每次提交时增量更新，查询走倒排索引，与库的大小基本无关
+"""
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import SEARCH_DB_PATH, SEARCH_TITLE_WEIGHT, SEARCH_SNIPPET_TOKENS
+
+logger = logging.getLogger("search_index")
+
+# 引号内的短语或单个词
+_QUERY_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def build_match_query(query: str) -> str:
+    """
+    把用户输入转换为安全的FTS5查询：每个词或引号短语都作为字面短语，彼此为AND关系
+    例如  central bank "ETF outflows"  ->  "central" "bank" "ETF outflows"
+    """
+    terms = []
+    for phrase, word in _QUERY_TERM.findall(query or ''):
+        term = (phrase or word).replace('"', '').strip()
+        if term:
+            terms.append(f'"{term}"')
+    return ' '.join(terms)
+
+
+class SearchIndex:
+    """文章全文索引，保存在独立的SQLite文件中，多个进程共享"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        id INTEGER PRIMARY KEY,
+        link TEXT UNIQUE NOT NULL,
+        source TEXT,
+        pub_date TEXT,
+        fetched_at TEXT,
+        score REAL
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+        title,
+        body,
+        tokenize = 'porter unicode61'
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """
+
+    def __init__(self, path: Path = SEARCH_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def indexed_version(self) -> Optional[int]:
+        """索引对应的文章库版本号，从未建立过时为None"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'store_version'").fetchone()
+        return int(row[0]) if row else None
+
+    def _set_version(self, conn: sqlite3.Connection, version: int, replace: bool = False) -> None:
+        """记录索引对应的库版本；并发的增量更新可能乱序完成，只取较大值"""
+        if replace:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('store_version', ?)", (str(version),))
+        else:
+            conn.execute(
+                """
+                INSERT INTO meta (key, value) VALUES ('store_version', ?)
+                ON CONFLICT(key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))
+                """,
+                (str(version),)
+            )
+
+    def _delete(self, conn: sqlite3.Connection, links: Iterable[str]) -> None:
+        for link in links:
+            row = conn.execute("SELECT id FROM docs WHERE link = ?", (link,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM docs_fts WHERE rowid = ?", row)
+                conn.execute("DELETE FROM docs WHERE id = ?", row)
+
+    def _insert(self, conn: sqlite3.Connection, articles: Iterable[Dict]) -> None:
+        for article in articles:
+            cursor = conn.execute(
+                "INSERT INTO docs (link, source, pub_date, fetched_at, score) VALUES (?, ?, ?, ?, ?)",
+                (article['link'], article.get('source'), article.get('pub_date'),
+                 article.get('fetched_at'), article.get('score'))
+            )
+            body = article.get('content') or article.get('summary') or ''
+            conn.execute(
+                "INSERT INTO docs_fts (rowid, title, body) VALUES (?, ?, ?)",
+                (cursor.lastrowid, article.get('title') or '', body)
+            )
+
+    def update(self, articles: Iterable[Dict] = (), deletes: Iterable[str] = (),
+               version: Optional[int] = None) -> None:
+        """增量更新：重新索引给定文章，删除给定链接"""
+        articles = [article for article in articles if article.get('link')]
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._delete(conn, set(deletes) | {article['link'] for article in articles})
+            self._insert(conn, articles)
+            if version is not None:
+                self._set_version(conn, version)
+
+    def rebuild(self, articles: Iterable[Dict], version: Optional[int] = None) -> int:
+        """清空并重建索引，返回索引的文章数"""
+        conn = self._connection()
+        count = 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM docs_fts")
+            conn.execute("DELETE FROM docs")
+            for article in articles:
+                if article.get('link'):
+                    self._insert(conn, [article])
+                    count += 1
+            if version is not None:
+                self._set_version(conn, version, replace=True)
+        logger.info(f"全文索引已重建，共 {count} 篇文章")
+        return count
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """
+        全文检索，返回 (命中总数, 当前页结果)
+        结果按BM25排序（标题权重更高），附带高亮片段
+        """
+        match = build_match_query(query)
+        if not match:
+            return 0, []
+        conn = self._connection()
+        try:
+            total = conn.execute(
+                "SELECT COUNT(*) FROM docs_fts WHERE docs_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT docs.link, highlight(docs_fts, 0, '<mark>', '</mark>'),
+                       snippet(docs_fts, 1, '<mark>', '</mark>', '…', {int(SEARCH_SNIPPET_TOKENS)}),
+                       docs.source, docs.pub_date, docs.fetched_at, docs.score,
+                       bm25(docs_fts, {float(SEARCH_TITLE_WEIGHT)}, 1.0) AS rank
+                FROM docs_fts JOIN docs ON docs.id = docs_fts.rowid
+                WHERE docs_fts MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+                """,
+                (match, limit, offset)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"无法执行检索 {query!r}: {e}")
+            return 0, []
+
+        results = [
+            {
+                'link': link,
+                'title': title,
+                'snippet': snippet,
+                'source': source,
+                'pub_date': pub_date,
+                'fetched_at': fetched_at,
+                'score': score,
+                # FTS5的bm25越小越相关，取反后越大越相关
+                'rank': -rank
+            }
+            for link, title, snippet, source, pub_date, fetched_at, score, rank in rows
+        ]
+        return total, results
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """进程内共享的全文索引"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
@@ -2,45 +2,50 @@
 Gold Spider Web Application
 Displays gold news articles in a web interface.
 """
-import json
 import datetime
-from pathlib import Path
 from flask import Flask, render_template, jsonify, request, redirect, url_for
 
-from app.config import JSON_DB_PATH
+from app.article_store import get_store
+from app.article_cache import get_article_cache
 
 app = Flask(__name__, 
             template_folder='../templates',
             static_folder='../static')
 
 def load_articles():
-    """Load articles from the JSON database"""
+    """Articles from the in-memory cache, newest first (shared, do not modify)"""
     try:
-        if not Path(JSON_DB_PATH).exists():
-            return []
-            
-        with open(JSON_DB_PATH, 'r') as f:
-            articles = json.load(f)
-            
-        # Sort articles by publication date (newest first)
-        articles.sort(key=lambda x: x.get('fetched_at', ''), reverse=True)
-        return articles
+        return get_article_cache().articles()
     except Exception as e:
         print(f"Error loading articles: {e}")
         return []
 
+def render_index(articles):
+    """Render the main page (also used by app/publish.py for the static copy)"""
+    return render_template('index.html', articles=articles)
+
+def render_article(article):
+    """Render an article page, loading its body from the blob store"""
+    article = {**article, 'content': get_store().load_content(article)}
+    return render_template('article.html', article=article)
+
 @app.route('/')
 def index():
-    """Main page displaying all articles"""
-    articles = load_articles()
-    return render_template('index.html', articles=articles)
+    """Main page displaying all articles, rendered once per store version"""
+    try:
+        snapshot = get_article_cache().snapshot()
+    except Exception as e:
+        print(f"Error loading articles: {e}")
+        return render_index([])
+    return snapshot.derive('page:index', None, render_index)
 
-@app.route('/article/<int:article_id>')
+@app.route('/article/<article_id>')
 def article_detail(article_id):
-    """Detail page for a specific article"""
-    articles = load_articles()
-    if 0 <= article_id < len(articles):
-        return render_template('article.html', article=articles[article_id])
+    """Detail page for a specific article, by its stable ID"""
+    snapshot = get_article_cache().snapshot()
+    article = snapshot.index.get_by_id(article_id)
+    if article is not None:
+        return snapshot.derive(f'page:article:{article_id}', None, lambda _: render_article(article))
     return redirect(url_for('index'))
 
 @app.route('/api/articles')
@@ -49,20 +54,29 @@ def api_articles():
     articles = load_articles()
     return jsonify(articles)
 
-@app.route('/api/article/<int:article_id>')
+@app.route('/api/article/<article_id>')
 def api_article(article_id):
     """API endpoint to get a specific article as JSON"""
-    articles = load_articles()
-    if 0 <= article_id < len(articles):
-        return jsonify(articles[article_id])
+    article = get_article_cache().get_by_id(article_id)
+    if article is not None:
+        article = {**article, 'content': get_store().load_content(article)}
+        return jsonify(article)
     return jsonify({"error": "Article not found"}), 404
 
 @app.route('/source/<source>')
 def by_source(source):
     """Filter articles by source"""
-    articles = load_articles()
-    results = [a for a in articles if a.get('source') == source]
-    return render_template('source.html', articles=results, source=source)
+    try:
+        snapshot = get_article_cache().snapshot()
+    except Exception as e:
+        print(f"Error loading articles: {e}")
+        return render_template('source.html', articles=[], source=source)
+    render = lambda _: render_template(
+        'source.html', articles=snapshot.index.by_time(field='source', value=source), source=source)
+    # Only known sources are cached, so arbitrary URLs cannot grow the cache
+    if not snapshot.index.count('source', source):
+        return render(None)
+    return snapshot.derive(f'page:source:{source}', None, render)
 
 @app.template_filter('format_date')
 def format_date(date_string):
@@ -0,0 +1,772 @@
+#!/usr/bin/env python3
+"""
+文章存储后端 - 按配置中的 STORAGE_TYPE 选择JSON文件、只追加的JSONL日志或SQLite
+所有读写文章库的组件都通过 get_storage() 获取后端
+
+调度线程、/scrape 后台任务和摘要器可以同时写入：
+写入在进程间锁内基于库中最新状态进行，每次提交递增版本号；
+写入方读取时的版本已过期时，把它的改动合并到最新版本上，而不是覆盖
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: 只做进程内互斥
+    fcntl = None
+
+from app.config import (
+    STORAGE_TYPE,
+    JSON_DB_PATH,
+    SQLITE_DB_PATH,
+    ARTICLE_LOG_PATH,
+    ARTICLE_SNAPSHOT_PATH,
+    ARTICLE_LOG_COMPACT_RECORDS
+)
+
+logger = logging.getLogger("storage")
+
+
+class FileLock:
+    """进程间互斥锁（flock），同一线程内可重入"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+def atomic_write(path: Path, data: str) -> None:
+    """写入同目录下的临时文件并fsync后rename，读者只会看到旧文件或完整的新文件"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def resolve_upserts(current: Callable[[str], Optional[Dict]],
+                    upserts: Iterable[Dict],
+                    patches: Iterable[Dict],
+                    conflict: bool) -> List[Dict]:
+    """
+    把写入方的改动合并到库中当前状态上，返回要写入的完整文章
+
+    upserts 是完整文章：版本冲突时叠加在库中当前文章上，保留其他写入方在此期间加入的字段
+    patches 只包含 link 和要修改的字段：总是叠加在当前文章上，文章已被删除时忽略
+    """
+    resolved: Dict[str, Dict] = {}
+    for article in upserts:
+        link = article.get('link')
+        if not link:
+            continue
+        existing = current(link) if conflict else None
+        resolved[link] = {**existing, **article} if existing else dict(article)
+    for patch in patches:
+        link = patch.get('link')
+        base = resolved.get(link) or (current(link) if link else None)
+        if base is None:
+            continue
+        resolved[link] = {**base, **patch}
+    return list(resolved.values())
+
+
+# 可用于排序的字段（SQLite中均有索引）
+SORTABLE_FIELDS = ("fetched_at", "pub_date", "score")
+
+
+def query_articles(articles: Iterable[Dict],
+                   since: Optional[str] = None,
+                   until: Optional[str] = None,
+                   min_score: Optional[float] = None,
+                   max_score: Optional[float] = None,
+                   source: Optional[str] = None,
+                   order_by: Optional[str] = None,
+                   descending: bool = True,
+                   limit: Optional[int] = None) -> List[Dict]:
+    """在内存中按抓取时间区间 (since, until]、分数区间 [min, max] 和来源过滤，可选排序和截断"""
+    result = [
+        article for article in articles
+        if (since is None or article.get('fetched_at', '') > since)
+        and (until is None or article.get('fetched_at', '') <= until)
+        and (min_score is None or (article.get('score') or 0) >= min_score)
+        and (max_score is None or (article.get('score') or 0) <= max_score)
+        and (source is None or article.get('source') == source)
+    ]
+    if order_by is not None:
+        if order_by not in SORTABLE_FIELDS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        default = 0 if order_by == 'score' else ''
+        result.sort(key=lambda x: x.get(order_by) or default, reverse=descending)
+    return result[:limit] if limit is not None else result
+
+
+def count_sources(articles: Iterable[Dict]) -> Dict[Optional[str], int]:
+    """按来源计数（没有来源的文章计在 None 下）"""
+    counts: Dict[Optional[str], int] = {}
+    for article in articles:
+        counts[article.get('source')] = counts.get(article.get('source'), 0) + 1
+    return counts
+
+
+class JSONStorage:
+    """JSON文件存储 - 每次写入都原子地重写整个文件，版本号保存在旁边的 .version 文件"""
+
+    def __init__(self, path: Path = JSON_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.version_path = self.path.with_suffix(self.path.suffix + '.version')
+        self._lock = FileLock(self.path.with_suffix(self.path.suffix + '.lock'))
+
+    def load_all(self) -> List[Dict]:
+        """加载全部文章"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError:
+            logger.error(f"数据库文件格式错误: {self.path}")
+            return []
+
+    def version(self) -> int:
+        try:
+            return int(self.version_path.read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def load_versioned(self) -> Tuple[int, List[Dict]]:
+        """读取全部文章及对应的版本号，用于之后的 commit(expected_version=...)"""
+        with self._lock:
+            return self.version(), self.load_all()
+
+    def get_by_link(self, link: str) -> Optional[Dict]:
+        for article in self.load_all():
+            if article.get('link') == link:
+                return article
+        return None
+
+    def get_many(self, links: Iterable[str]) -> List[Dict]:
+        links = set(links)
+        return [article for article in self.load_all() if article.get('link') in links] if links else []
+
+    def query(self, **filters) -> List[Dict]:
+        """按时间、分数和来源过滤，参数见 query_articles"""
+        return query_articles(self.load_all(), **filters)
+
+    def iter_articles(self, batch_size: int = 500) -> Iterator[Dict]:
+        """逐篇遍历文章（JSON文件只能整体解析，这里只是统一接口）"""
+        yield from self.load_all()
+
+    def count(self) -> int:
+        return len(self.load_all())
+
+    def source_counts(self) -> Dict[Optional[str], int]:
+        """每个来源的文章数"""
+        return count_sources(self.load_all())
+
+    def commit(self, upserts: Iterable[Dict] = (), deletes: Iterable[str] = (),
+               patches: Iterable[Dict] = (), expected_version: Optional[int] = None) -> int:
+        """一次写入：插入/替换文章（按link）、修改字段并删除指定链接，返回新版本号"""
+        with self._lock:
+            version = self.version()
+            articles = self.load_all()
+            by_link = {article.get('link'): article for article in articles}
+            conflict = expected_version is not None and expected_version != version
+            if conflict:
+                logger.info(f"数据库版本已从 {expected_version} 变为 {version}，合并本次改动")
+
+            upserts = resolve_upserts(by_link.get, upserts, patches, conflict)
+            deletes = set(deletes)
+            if not upserts and not deletes:
+                return version
+
+            replaced = {article['link']: article for article in upserts}
+            articles = [
+                replaced.pop(article.get('link'), article)
+                for article in articles
+                if article.get('link') not in deletes
+            ]
+            # 新文章排在前面
+            atomic_write(self.path, json.dumps(list(replaced.values()) + articles, ensure_ascii=False, indent=2))
+            atomic_write(self.version_path, str(version + 1))
+            return version + 1
+
+    def upsert_many(self, articles: Iterable[Dict]) -> int:
+        return self.commit(upserts=articles)
+
+    def update_fields(self, patches: Iterable[Dict]) -> int:
+        return self.commit(patches=patches)
+
+    def delete_links(self, links: Iterable[str]) -> int:
+        return self.commit(deletes=links)
+
+
+class JSONLStorage:
+    """
+    只追加的JSONL日志存储 - 每次写入只追加变化的记录
+    日志记录过多时轮换出一个日志段，在后台线程中与快照合并成新快照
+
+    读取顺序为 快照 -> 压缩中的日志段 -> 当前日志，重放是幂等的，
+    因此任意时刻崩溃都不会损坏数据：快照通过临时文件+rename整体替换，
+    日志末尾写了一半的行会被跳过。
+    版本号 = 快照头部记录的版本 + 之后重放的记录数，所有进程算出的结果一致
+    """
+
+    def __init__(self, log_path: Path = ARTICLE_LOG_PATH,
+                 snapshot_path: Path = ARTICLE_SNAPSHOT_PATH,
+                 json_path: Optional[Path] = JSON_DB_PATH,
+                 compact_records: int = ARTICLE_LOG_COMPACT_RECORDS):
+        self.log_path = Path(log_path)
+        self.snapshot_path = Path(snapshot_path)
+        self.segment_path = self.log_path.with_suffix(self.log_path.suffix + '.compacting')
+        self.compact_records = compact_records
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # link -> 文章，按写入顺序（旧 -> 新）
+        self._articles: Dict[str, Dict] = {}
+        # 进程间写锁在外层，进程内状态锁在内层
+        self._file_lock = FileLock(self.log_path.with_suffix(self.log_path.suffix + '.lock'))
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+
+        # 已加载的文件状态，用于增量读取其他进程追加的记录
+        self._snapshot_inode = None
+        self._snapshot_version = 0
+        self._log_inode = None
+        self._offset = 0
+        self._log_records = 0
+        self._version = 0
+
+        with self._file_lock:
+            # 首次使用时从JSON文件迁移
+            if json_path is not None and not self.snapshot_path.exists() and not self.log_path.exists():
+                self.migrate_from_json(json_path)
+
+            if self.segment_path.exists():
+                self._resume_compaction()
+            self._refresh()
+
+    @staticmethod
+    def _inode(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_ino
+        except FileNotFoundError:
+            return None
+
+    def _apply(self, record: Dict) -> None:
+        if record.get('op') == 'upsert':
+            article = record['article']
+            self._articles[article['link']] = article
+        elif record.get('op') == 'delete':
+            self._articles.pop(record['link'], None)
+
+    def _replay(self, path: Path, offset: int = 0, snapshot: bool = False) -> tuple:
+        """从 offset 开始重放文件中的完整行，返回 (新的offset, 读取的记录数)"""
+        count = 0
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # 写了一半的行（写入中或崩溃），不推进offset
+                        break
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"跳过损坏的记录: {path}")
+                        continue
+                    if snapshot:
+                        if 'link' not in record:
+                            # 快照头部
+                            self._snapshot_version = record.get('version', 0)
+                            continue
+                        record = {'op': 'upsert', 'article': record}
+                    self._apply(record)
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return offset, count
+
+    def _reload(self) -> None:
+        """从快照和日志完整重建内存状态"""
+        while True:
+            snapshot_inode = self._inode(self.snapshot_path)
+            log_inode = self._inode(self.log_path)
+            self._articles = {}
+            self._snapshot_version = 0
+            self._replay(self.snapshot_path, snapshot=True)
+            _, segment_records = self._replay(self.segment_path)
+            offset, log_records = self._replay(self.log_path)
+            # 读取期间快照或日志被压缩替换时重新读取
+            if (self._inode(self.snapshot_path) == snapshot_inode
+                    and self._inode(self.log_path) == log_inode):
+                break
+        self._snapshot_inode = snapshot_inode
+        self._log_inode = log_inode
+        self._offset = offset
+        self._log_records = segment_records + log_records
+        self._version = self._snapshot_version + self._log_records
+
+    def _refresh(self) -> None:
+        """读取其他进程追加的记录；快照或日志被替换时完整重建"""
+        with self._lock:
+            log_inode = self._inode(self.log_path)
+            if (self._inode(self.snapshot_path) != self._snapshot_inode
+                    or log_inode != self._log_inode):
+                self._reload()
+                return
+            if log_inode is not None and self.log_path.stat().st_size > self._offset:
+                self._read_log()
+
+    def _read_log(self) -> None:
+        self._offset, count = self._replay(self.log_path, self._offset)
+        self._log_records += count
+        self._version += count
+
+    def _append(self, records: List[Dict]) -> None:
+        """把记录一次性追加到日志并落盘"""
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+        fd = os.open(self.log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            stat = os.fstat(fd)
+            if stat.st_ino != self._log_inode:
+                # 新建的日志文件，从头读取
+                self._log_inode = stat.st_ino
+                self._offset = 0
+            if stat.st_size and os.pread(fd, 1, stat.st_size - 1) != b'\n':
+                # 日志末尾有崩溃留下的半行，先补换行使其成为一条可跳过的损坏记录
+                data = b'\n' + data
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def version(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def load_all(self) -> List[Dict]:
+        """加载全部文章，新文章在前（返回副本，调用方可以随意修改）"""
+        return self.load_versioned()[1]
+
+    def load_versioned(self) -> Tuple[int, List[Dict]]:
+        """读取全部文章及对应的版本号，用于之后的 commit(expected_version=...)"""
+        with self._lock:
+            self._refresh()
+            return self._version, [dict(article) for article in reversed(self._articles.values())]
+
+    def get_by_link(self, link: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            article = self._articles.get(link)
+            return dict(article) if article is not None else None
+
+    def get_many(self, links: Iterable[str]) -> List[Dict]:
+        with self._lock:
+            self._refresh()
+            return [dict(self._articles[link]) for link in links if link in self._articles]
+
+    def query(self, **filters) -> List[Dict]:
+        """按时间、分数和来源过滤，只复制命中的文章，参数见 query_articles"""
+        with self._lock:
+            self._refresh()
+            matched = query_articles(reversed(self._articles.values()), **filters)
+        return [dict(article) for article in matched]
+
+    def iter_articles(self, batch_size: int = 500) -> Iterator[Dict]:
+        """按新 -> 旧逐批遍历当前文章，不一次性复制整个库"""
+        with self._lock:
+            self._refresh()
+            articles = list(self._articles.values())
+        for i in range(len(articles) - 1, -1, -batch_size):
+            for article in reversed(articles[max(0, i - batch_size + 1):i + 1]):
+                yield dict(article)
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._articles)
+
+    def source_counts(self) -> Dict[Optional[str], int]:
+        """每个来源的文章数"""
+        with self._lock:
+            self._refresh()
+            return count_sources(self._articles.values())
+
+    def commit(self, upserts: Iterable[Dict] = (), deletes: Iterable[str] = (),
+               patches: Iterable[Dict] = (), expected_version: Optional[int] = None) -> int:
+        """追加删除和插入/更新记录，写入量与变化的文章数成正比，返回新版本号"""
+        with self._file_lock, self._lock:
+            self._refresh()
+            conflict = expected_version is not None and expected_version != self._version
+            if conflict:
+                logger.info(f"文章库版本已从 {expected_version} 变为 {self._version}，合并本次改动")
+
+            records = [{'op': 'delete', 'link': link} for link in deletes]
+            records += [
+                {'op': 'upsert', 'article': article}
+                for article in resolve_upserts(self._articles.get, upserts, patches, conflict)
+            ]
+            if not records:
+                return self._version
+
+            self._append(records)
+            # 从上次读取的位置重放（持有写锁，此时日志中只有本次追加的记录未读）
+            self._read_log()
+            if self._log_records > max(self.compact_records, len(self._articles)):
+                self._start_compaction()
+            return self._version
+
+    def upsert_many(self, articles: Iterable[Dict]) -> int:
+        return self.commit(upserts=articles)
+
+    def update_fields(self, patches: Iterable[Dict]) -> int:
+        return self.commit(patches=patches)
+
+    def delete_links(self, links: Iterable[str]) -> int:
+        return self.commit(deletes=links)
+
+    @staticmethod
+    def _snapshot_data(articles: List[Dict], version: int) -> str:
+        """快照首行记录版本号，之后每行一篇文章（旧 -> 新）"""
+        lines = [json.dumps({'version': version})]
+        lines.extend(json.dumps(article, ensure_ascii=False) for article in articles)
+        return '\n'.join(lines) + '\n'
+
+    def _start_compaction(self) -> None:
+        """轮换出当前日志段，在后台线程中合并为新快照（调用方持有写锁）"""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if self.segment_path.exists() or not self.log_path.exists():
+                return
+            os.replace(self.log_path, self.segment_path)
+            self._log_inode = None
+            self._offset = 0
+            self._log_records = 0
+            # 此刻的内存状态 = 快照 + 日志段，之后的写入都进入新日志
+            articles = list(self._articles.values())
+            self._compactor = threading.Thread(
+                target=self._compact, args=(articles, self._version), daemon=True
+            )
+            self._compactor.start()
+
+    def _compact(self, articles: List[Dict], version: int) -> None:
+        try:
+            data = self._snapshot_data(articles, version)
+            if self._finish_compaction(data):
+                logger.info(f"文章日志已压缩为快照，共 {len(articles)} 篇文章")
+        except OSError as e:
+            logger.error(f"压缩文章日志失败: {e}")
+
+    def _finish_compaction(self, data: str) -> bool:
+        """在写锁内替换快照并删除日志段；日志段已被其他进程合并时放弃"""
+        with self._file_lock:
+            if not self.segment_path.exists():
+                return False
+            atomic_write(self.snapshot_path, data)
+            self.segment_path.unlink()
+            return True
+
+    def _resume_compaction(self) -> None:
+        """上次压缩未完成（进程在压缩中退出），把快照和日志段合并为新快照"""
+        self._articles = {}
+        self._snapshot_version = 0
+        self._replay(self.snapshot_path, snapshot=True)
+        _, segment_records = self._replay(self.segment_path)
+        self._finish_compaction(
+            self._snapshot_data(list(self._articles.values()), self._snapshot_version + segment_records)
+        )
+        logger.info("完成了上次中断的文章日志压缩")
+
+    def compact(self) -> None:
+        """同步压缩（用于命令行和测试）"""
+        with self._file_lock:
+            self._refresh()
+            self._start_compaction()
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def migrate_from_json(self, json_path: Path = JSON_DB_PATH) -> int:
+        """把JSON文件中的文章写成初始快照，返回导入的文章数"""
+        articles = JSONStorage(json_path).load_all() if Path(json_path).exists() else []
+        if articles:
+            # JSON文件中新文章在前，快照按旧 -> 新保存
+            atomic_write(
+                self.snapshot_path,
+                self._snapshot_data([article for article in reversed(articles) if article.get('link')], 0)
+            )
+            logger.info(f"从 {json_path} 迁移了 {len(articles)} 篇文章到JSONL日志存储")
+        return len(articles)
+
+
+class SQLiteStorage:
+    """SQLite存储 - WAL模式，按行增量读写，版本号保存在 meta 表"""
+
+    # 常用查询字段单独成列并建索引，完整文章以JSON保存在 data 列
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS articles (
+        link TEXT PRIMARY KEY,          -- 主键即link上的唯一索引
+        title TEXT,
+        source TEXT,
+        pub_date TEXT,
+        fetched_at TEXT,
+        score REAL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_articles_fetched_at ON articles(fetched_at);
+    CREATE INDEX IF NOT EXISTS idx_articles_pub_date ON articles(pub_date);
+    CREATE INDEX IF NOT EXISTS idx_articles_score ON articles(score);
+    CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source);
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """
+
+    UPSERT_SQL = """
+    INSERT INTO articles (link, title, source, pub_date, fetched_at, score, data)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(link) DO UPDATE SET
+        title = excluded.title,
+        source = excluded.source,
+        pub_date = excluded.pub_date,
+        fetched_at = excluded.fetched_at,
+        score = excluded.score,
+        data = excluded.data
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, path: Path = SQLITE_DB_PATH, json_path: Optional[Path] = JSON_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        # 旧版本写入的空分数补成0，分数范围查询才能直接比较 score 列并使用索引
+        conn.execute("UPDATE articles SET score = 0 WHERE score IS NULL")
+        conn.commit()
+
+        # 首次使用时从JSON文件迁移
+        if json_path is not None:
+            self.migrate_from_json(json_path)
+
+    def _connection(self) -> sqlite3.Connection:
+        """每个线程一个连接（调度线程和API共用一个进程）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(article: Dict) -> tuple:
+        return (
+            article.get('link'),
+            article.get('title'),
+            article.get('source'),
+            article.get('pub_date'),
+            article.get('fetched_at'),
+            # 没有分数按0处理（与 query_articles 相同），data 列中仍保留原值
+            article.get('score') or 0,
+            json.dumps(article, ensure_ascii=False)
+        )
+
+    def _select(self, where: str = "", params: tuple = (), suffix: str = "") -> List[Dict]:
+        sql = f"SELECT data FROM articles {where} {suffix}"
+        return [json.loads(row[0]) for row in self._connection().execute(sql, params)]
+
+    def load_all(self) -> List[Dict]:
+        """加载全部文章，新文章在前（与JSON / JSONL后端相同）"""
+        return self._select(suffix="ORDER BY fetched_at DESC")
+
+    def version(self) -> int:
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def load_versioned(self) -> Tuple[int, List[Dict]]:
+        """在同一个读事务中读取版本号和全部文章"""
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN")
+            return self.version(), self._select(suffix="ORDER BY fetched_at DESC")
+
+    def get_by_link(self, link: str) -> Optional[Dict]:
+        rows = self._select("WHERE link = ?", (link,))
+        return rows[0] if rows else None
+
+    def get_many(self, links: Iterable[str]) -> List[Dict]:
+        links = list(links)
+        articles = []
+        for i in range(0, len(links), self.BATCH_SIZE):
+            batch = links[i:i + self.BATCH_SIZE]
+            articles.extend(self._select(f"WHERE link IN ({','.join('?' * len(batch))})", tuple(batch)))
+        return articles
+
+    def query(self,
+              since: Optional[str] = None,
+              until: Optional[str] = None,
+              min_score: Optional[float] = None,
+              max_score: Optional[float] = None,
+              source: Optional[str] = None,
+              order_by: Optional[str] = None,
+              descending: bool = True,
+              limit: Optional[int] = None) -> List[Dict]:
+        """按时间、分数和来源过滤（走索引），语义与 query_articles 相同"""
+        clauses, params = [], []
+        for condition, value in (
+            ("fetched_at > ?", since),
+            ("fetched_at <= ?", until),
+            ("score >= ?", min_score),
+            ("score <= ?", max_score),
+            ("source = ?", source)
+        ):
+            if value is not None:
+                clauses.append(condition)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        suffix = ""
+        if order_by is not None:
+            if order_by not in SORTABLE_FIELDS:
+                raise ValueError(f"不支持的排序字段: {order_by}")
+            suffix = f"ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            suffix += " LIMIT ?"
+            params.append(limit)
+        return self._select(where, tuple(params), suffix)
+
+    def iter_articles(self, batch_size: int = 500) -> Iterator[Dict]:
+        """用独立的只读连接按新 -> 旧分批读取，遍历期间不阻塞本线程的写入"""
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            cursor = conn.execute("SELECT data FROM articles ORDER BY fetched_at DESC")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield json.loads(row[0])
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def source_counts(self) -> Dict[Optional[str], int]:
+        """每个来源的文章数（走 source 索引）"""
+        return dict(self._connection().execute("SELECT source, COUNT(*) FROM articles GROUP BY source"))
+
+    def commit(self, upserts: Iterable[Dict] = (), deletes: Iterable[str] = (),
+               patches: Iterable[Dict] = (), expected_version: Optional[int] = None) -> int:
+        """在一个写事务中批量插入/更新和删除，只触及变化的行，返回新版本号"""
+        conn = self._connection()
+        with conn:
+            # 立即获取写锁，保证合并基于最新数据
+            conn.execute("BEGIN IMMEDIATE")
+            version = self.version()
+            conflict = expected_version is not None and expected_version != version
+            if conflict:
+                logger.info(f"数据库版本已从 {expected_version} 变为 {version}，合并本次改动")
+
+            rows = [self._row(article) for article in resolve_upserts(self.get_by_link, upserts, patches, conflict)]
+            links = [(link,) for link in deletes]
+            if not rows and not links:
+                return version
+
+            for i in range(0, len(links), self.BATCH_SIZE):
+                conn.executemany("DELETE FROM articles WHERE link = ?", links[i:i + self.BATCH_SIZE])
+            for i in range(0, len(rows), self.BATCH_SIZE):
+                conn.executemany(self.UPSERT_SQL, rows[i:i + self.BATCH_SIZE])
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                (str(version + 1),)
+            )
+            return version + 1
+
+    def upsert_many(self, articles: Iterable[Dict]) -> int:
+        return self.commit(upserts=articles)
+
+    def update_fields(self, patches: Iterable[Dict]) -> int:
+        return self.commit(patches=patches)
+
+    def delete_links(self, links: Iterable[str]) -> int:
+        return self.commit(deletes=links)
+
+    def migrate_from_json(self, json_path: Path = JSON_DB_PATH, force: bool = False) -> int:
+        """一次性把JSON文件中的文章导入SQLite，返回导入的文章数"""
+        conn = self._connection()
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if done and not force:
+            return 0
+
+        articles = JSONStorage(json_path).load_all() if Path(json_path).exists() else []
+        self.upsert_many(articles)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (str(json_path),)
+            )
+        if articles:
+            logger.info(f"从 {json_path} 迁移了 {len(articles)} 篇文章到SQLite")
+        return len(articles)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """按 STORAGE_TYPE 返回进程内共享的存储后端"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_TYPE == "sqlite":
+                _storage = SQLiteStorage()
+            elif STORAGE_TYPE == "jsonl":
+                _storage = JSONLStorage()
+            else:
+                _storage = JSONStorage()
+        return _storage
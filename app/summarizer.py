@@ -3,14 +3,14 @@ Summarizer Module
 
 This module uses the local Ollama model to summarize gold news articles.
 """
-import json
 import logging
 import subprocess
 from typing import Dict, Optional, List, Any
 import time
 from pathlib import Path
 
-from app.config import OLLAMA_MODEL, OLLAMA_HOST, SUMMARY_TEMPLATE, JSON_DB_PATH
+from app.config import OLLAMA_MODEL, OLLAMA_HOST, SUMMARY_TEMPLATE
+from app.article_store import get_store
 
 # Configure logging
 logging.basicConfig(
@@ -27,7 +27,7 @@ class ArticleSummarizer:
 
     def __init__(self, model_name: str = OLLAMA_MODEL):
         self.model_name = model_name
-        self.db_path = JSON_DB_PATH
+        self.store = get_store()
 
     def summarize_article(self, title: str, content: str) -> Optional[str]:
         """
@@ -128,13 +128,8 @@ class ArticleSummarizer:
         Returns:
             List[Dict[str, Any]]: List of processed articles
         """
-        # Read the database
-        try:
-            with open(self.db_path, "r") as f:
-                articles = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            logger.error(f"Error reading database: {e}")
-            return []
+        # Read the database, bodies included
+        articles = self.store.load_all(with_content=True)
         
         # Find unsummarized articles with content
         unsummarized = [
@@ -167,21 +162,29 @@ class ArticleSummarizer:
         
         # Update the database with processed articles
         if processed_articles:
-            self._update_database(articles)
+            self._update_database(processed_articles)
             logger.info(f"Updated {len(processed_articles)} articles in database")
         
         return processed_articles
     
     def _update_database(self, articles: List[Dict[str, Any]]) -> None:
         """
-        Update the database with the modified articles
+        Write the modified articles back to the store
         
         Args:
-            articles (List[Dict[str, Any]]): The full list of articles
+            articles (List[Dict[str, Any]]): The articles that were summarized
         """
         try:
-            with open(self.db_path, "w") as f:
-                json.dump(articles, f, indent=2)
+            # Only write the summary fields, so a concurrent scrape or rescore is not overwritten
+            self.store.update_fields(
+                {
+                    "link": article["link"],
+                    "summary": article["summary"],
+                    "summarized": article["summarized"],
+                    "summarized_at": article["summarized_at"]
+                }
+                for article in articles
+            )
         except Exception as e:
             logger.error(f"Error updating database: {e}")
 
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+文本处理工具 - 分词等供索引、去重共用的基础函数
+"""
+import re
+from typing import Dict, List
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# 英文停用词 - 不参与索引
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his i if in into is it its
+of on or our she so than that the their them there these they this to was we were what when
+which who will with would you your said says also after before over more about up out new
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """把文本切分为小写词项，去除停用词"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def term_frequencies(tokens: List[str]) -> Dict[str, int]:
+    """统计词频"""
+    frequencies: Dict[str, int] = {}
+    for token in tokens:
+        frequencies[token] = frequencies.get(token, 0) + 1
+    return frequencies
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+URL规范化 - 去掉跟踪参数、AMP变体、尾部斜杠等差异
+并提供从规范URL哈希到文章的紧凑索引，用于O(1)去重
+"""
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.config import URL_TRACKING_PARAMS, URL_TRACKING_PREFIXES, URL_TRACKING_PARAMS_BY_DOMAIN
+
+# 只在比较身份时忽略的主机前缀（存储的链接保留原主机，保证可以访问）
+_HOST_ALIAS_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_AMP_PATH = re.compile(r"(^|/)amp(/|$)")
+
+
+def _domain_tracking_params(host: str) -> frozenset:
+    """该主机及其上级域名配置的跟踪参数"""
+    labels = host.split(".")
+    params = set()
+    for i in range(len(labels) - 1):
+        params.update(URL_TRACKING_PARAMS_BY_DOMAIN.get(".".join(labels[i:]), ()))
+    return frozenset(params)
+
+
+def _is_tracking_param(name: str, domain_params: frozenset = frozenset()) -> bool:
+    name = name.lower()
+    return name in URL_TRACKING_PARAMS or name in domain_params or name.startswith(URL_TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化URL，结果仍可直接访问：
+    小写scheme/主机、去默认端口、去跟踪参数和片段、去AMP路径、去尾部斜杠、参数排序
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    port = None
+    try:
+        port = parts.port
+    except ValueError:
+        pass
+    netloc = host
+    if port and str(port) != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    path = _AMP_PATH.sub(r"\1", path) or "/"
+    if path.endswith(".amp"):
+        path = path[:-len(".amp")]
+    if not path.startswith("/"):
+        path = "/" + path
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    domain_params = _domain_tracking_params(host)
+    query_items = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name, domain_params)
+        and not (name.lower() in ("amp", "outputtype", "output") and value.lower() in ("", "1", "amp", "true"))
+    ]
+    query = urlencode(sorted(query_items))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def url_key(url: str) -> str:
+    """用于判断是否同一篇文章的身份键：规范URL再忽略scheme和 www./m. 等主机别名"""
+    canonical = canonicalize_url(url)
+    parts = urlsplit(canonical)
+    if not parts.netloc:
+        return canonical
+    host = parts.netloc
+    for prefix in _HOST_ALIAS_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    path = parts.path if parts.path != "/" else ""
+    return f"{host}{path}" + (f"?{parts.query}" if parts.query else "")
+
+
+def url_hash(url: str) -> int:
+    """身份键的64位哈希"""
+    digest = hashlib.blake2b(url_key(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def article_id(url: str) -> str:
+    """文章的稳定ID：身份键哈希的16位十六进制，链接的跟踪参数等变化不影响ID"""
+    return f"{url_hash(url):016x}"
+
+
+class LinkIndex:
+    """规范URL哈希 -> 文章 的索引，查找和插入均为O(1)"""
+
+    def __init__(self, articles: Iterable[Dict] = ()):
+        self._index: Dict[int, Dict] = {}
+        for article in articles:
+            self.add(article)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, url: str) -> bool:
+        return url_hash(url) in self._index
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self._index.get(url_hash(url))
+
+    def add(self, article: Dict) -> bool:
+        """加入文章；若同一规范URL已存在则不覆盖并返回False"""
+        key = url_hash(article.get("link", ""))
+        if key in self._index:
+            return False
+        self._index[key] = article
+        return True
+
+    def remove(self, url: str) -> Optional[Dict]:
+        return self._index.pop(url_hash(url), None)
+
+
+def dedupe_by_link(articles: Iterable[Dict], index: Optional[LinkIndex] = None) -> List[Dict]:
+    """按规范URL去重，保留先出现的文章；传入index时同时排除索引中已有的链接"""
+    index = index if index is not None else LinkIndex()
+    return [article for article in articles if index.add(article)]
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+备份和恢复 Gold Spider 文章库
+默认写增量备份（只包含上次备份后变化的文章），备份链的增量数满了时自动写新的基础快照
+详见 app/backup.py
+"""
+
+import argparse
+
+from app.backup import get_backup_manager
+
+def list_backups():
+    """列出全部备份链及其增量"""
+    chains = get_backup_manager().chains()
+    if not chains:
+        print("还没有备份")
+        return
+    for chain in chains:
+        print(f"{chain['dir']}  基础快照版本 {chain['base_version']}  创建于 {chain['created_at']}")
+        for delta in chain['deltas']:
+            print(f"    {delta['file']}  版本 {delta['version']}  写入 {delta['upserts']} 篇，删除 {delta['deletes']} 篇")
+
+def run_backup(full: bool = False):
+    """写一次备份"""
+    entry = get_backup_manager().backup(full=full)
+    if entry is None:
+        print("文章库自上次备份后没有变化")
+    else:
+        print(f"备份完成: {entry['file']}（写入 {entry['upserts']} 篇，删除 {entry['deletes']} 篇）")
+
+def run_restore(version=None):
+    """把文章库恢复到最新的备份，或不晚于指定版本的最近一次备份"""
+    count = get_backup_manager().restore(version)
+    print(f"恢复完成！文章库现在有 {count} 篇文章。")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="增量备份和恢复文章库")
+    parser.add_argument("--full", action="store_true", help="写新的基础快照而不是增量")
+    parser.add_argument("--list", action="store_true", help="列出全部备份")
+    parser.add_argument("--restore", action="store_true", help="从备份恢复文章库")
+    parser.add_argument("--version", type=int, default=None, help="与 --restore 一起使用，恢复到不晚于该版本的备份")
+    args = parser.parse_args()
+    
+    if args.list:
+        list_backups()
+    elif args.restore:
+        run_restore(args.version)
+    else:
+        run_backup(full=args.full)
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+把文章库和归档增量导出为按日期分区的Parquet文件（需要安装 pyarrow）
+每次只写尚未导出的已结束日期，详见 app/parquet_export.py
+"""
+
+import argparse
+
+from app.parquet_export import ParquetExporter
+from app.config import EXPORT_DIR, EXPORT_INCLUDE_BODY
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="增量导出文章为Parquet")
+    parser.add_argument("--with-body", action="store_true", default=EXPORT_INCLUDE_BODY, help="导出正文列")
+    parser.add_argument("--until", default=None, help="只导出早于该UTC日期（YYYY-MM-DD）的分区，默认到UTC昨天为止")
+    parser.add_argument("--output", default=str(EXPORT_DIR), help="导出目录")
+    args = parser.parse_args()
+    
+    exporter = ParquetExporter(root=args.output, include_body=args.with_body)
+    written = exporter.export(until=args.until)
+    print(f"导出完成！新写入 {written} 个日期分区到 {args.output}")
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+把首页和文章页预渲染为静态HTML，供nginx直接提供（见 nginx/goldspider.conf 的 try_files）
+只重新渲染变化的文章页，详见 app/publish.py；开启 PUBLISH_ENABLED 后调度器会在每次聚合后自动发布
+"""
+
+import argparse
+
+from app.publish import PagePublisher
+from app.config import PUBLISH_DIR
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="发布静态页面")
+    parser.add_argument("--force", action="store_true", help="重新渲染全部页面（例如修改模板之后）")
+    parser.add_argument("--output", default=str(PUBLISH_DIR), help="发布目录")
+    args = parser.parse_args()
+    
+    rendered = PagePublisher(root=args.output).publish(force=args.force)
+    if rendered is None:
+        print(f"文章库没有变化，{args.output} 已是最新")
+    else:
+        print(f"发布完成！重新渲染 {rendered} 篇文章页到 {args.output}")
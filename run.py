@@ -7,7 +7,6 @@ import sys
 import threading
 import time
 import logging
-from pathlib import Path
 
 # 配置日志
 logging.basicConfig(
@@ -39,7 +38,8 @@ def main():
     print("="*50)
     
     # 检查是否已有数据，否则先运行一次聚合
-    if not Path("data/news_db.json").exists():
+    from app.article_store import get_store
+    if get_store().count() == 0:
         print("数据库不存在，正在首次聚合新闻...")
         from app.news_aggregator import ReliableNewsAggregator
         aggregator = ReliableNewsAggregator()